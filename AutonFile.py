@@ -0,0 +1,138 @@
+# Python Module AutonFile
+# Reading and writing .auton saves.
+#
+# Saves are a small binary container, all values little-endian:
+#   header      magic b'AUTN', format version, flags, point count n, turn count m, start heading,
+#               robot size in inches (x by y, NaN when it was never configured), field configuration name
+#   points      2n float64, x and y of every point in field pixels
+#   velocities  n - 1 float64, velocity of every path in in/s
+#   turns       m uint32 point indices followed by m float64 angles
+#   segments    n - 1 uint8 segment types (see Curves) followed by 4(n - 1) float64 Bezier handles, since
+#               version 2, paths of older saves are straight
+# The whole file is read with one buffered read and the arrays are copied straight out of it.
+# Saves from older versions of the studio (plain text, point and turn counts followed by one
+# "x y" / "index angle" pair per line) are still read.
+import math
+import struct
+import sys
+from array import array
+
+MAGIC = b'AUTN'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIIddd32s')
+
+
+class Routine:
+
+    def __init__(self, points, turns, velocities, start_heading=0.0, robot_size=None, field_configuration='None',
+                 segments=None, handles=None):
+        self.points = points
+        self.turns = turns
+        self.velocities = velocities
+        # Segment type and Bezier handles (x1, y1, x2, y2) of every path, None when all paths are straight
+        self.segments = segments
+        self.handles = handles
+        self.start_heading = start_heading
+        # Robot size in inches as (x, y), None if unknown
+        self.robot_size = robot_size
+        # Field configuration name, None if unknown
+        self.field_configuration = field_configuration
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def dumps(routine):
+    robot_size = routine.robot_size if routine.robot_size is not None else (math.nan, math.nan)
+    field_configuration = routine.field_configuration if routine.field_configuration is not None else 'None'
+    points = array('d', (c for p in routine.points for c in (p[0], p[1])))
+    velocities = array('d', routine.velocities)
+    turns = list(routine.turns)
+    turn_indices = array('I', (t[0] for t in turns))
+    turn_angles = array('d', (float(t[1]) for t in turns))
+    path_count = max(len(routine.points) - 1, 0)
+    segments = array('B', routine.segments if routine.segments is not None else [0] * path_count)
+    handles = array('d', (float(c) for h in routine.handles for c in h) if routine.handles is not None
+                    else [0.0] * (4 * path_count))
+    data = bytearray(HEADER.pack(MAGIC, VERSION, 0, len(routine.points), len(turns), float(routine.start_heading),
+                                 robot_size[0], robot_size[1], field_configuration.encode('utf-8')))
+    for values in (points, velocities, turn_indices, turn_angles, segments, handles):
+        data += _little_endian(values).tobytes()
+    return bytes(data)
+
+
+def _read_array(typecode, data, offset, count):
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    if end > len(data):
+        raise ValueError('Auton file is truncated')
+    values.frombytes(data[offset:end])
+    return _little_endian(values), end
+
+
+def loads(data):
+    if not data.startswith(MAGIC):
+        return _loads_legacy(data.decode('utf-8'))
+    if len(data) < HEADER.size:
+        raise ValueError('Auton file is truncated')
+    (_, version, _, point_count, turn_count, start_heading, robot_size_x, robot_size_y,
+     field_configuration) = HEADER.unpack_from(data)
+    if version > VERSION:
+        raise ValueError(f'Auton file version {version} is newer than this studio supports ({VERSION})')
+    data = memoryview(data)
+    points, offset = _read_array('d', data, HEADER.size, 2 * point_count)
+    velocities, offset = _read_array('d', data, offset, max(point_count - 1, 0))
+    turn_indices, offset = _read_array('I', data, offset, turn_count)
+    turn_angles, offset = _read_array('d', data, offset, turn_count)
+    segments = None
+    handles = None
+    if version >= 2:
+        path_count = max(point_count - 1, 0)
+        segments, offset = _read_array('B', data, offset, path_count)
+        handles, offset = _read_array('d', data, offset, 4 * path_count)
+        segments = segments.tolist()
+        handles = [handles[4 * s:4 * s + 4].tolist() for s in range(path_count)]
+    robot_size = None
+    if not (math.isnan(robot_size_x) or math.isnan(robot_size_y)):
+        robot_size = (robot_size_x, robot_size_y)
+    return Routine(points=[[points[2 * i], points[2 * i + 1]] for i in range(point_count)],
+                   turns=[[turn_indices[i], turn_angles[i]] for i in range(turn_count)],
+                   velocities=velocities.tolist(), start_heading=start_heading, robot_size=robot_size,
+                   field_configuration=field_configuration.rstrip(b'\0').decode('utf-8'), segments=segments,
+                   handles=handles)
+
+
+def _loads_legacy(text, default_velocity=48):
+    try:
+        return _parse_legacy(text.split('\n'), default_velocity)
+    except IndexError:
+        raise ValueError('Auton file is truncated')
+
+
+def _parse_legacy(lines, default_velocity):
+    num_points = int(lines[0])
+    points = []
+    for line in lines[1:num_points + 1]:
+        line = line.split()
+        points.append([float(line[0]), float(line[1])])
+    num_turns = int(lines[num_points + 1])
+    turns = []
+    for line in lines[num_points + 2:num_points + 2 + num_turns]:
+        line = line.split()
+        turns.append([int(line[0]), float(line[1])])
+    # Old saves did not keep velocities, the start heading or the field configuration
+    return Routine(points=points, turns=turns, velocities=[default_velocity] * max(num_points - 1, 0),
+                   field_configuration=None)
+
+
+def load(path):
+    with open(path, 'rb') as save_file:
+        return loads(save_file.read())
+
+
+def save(path, routine):
+    with open(path, 'wb') as save_file:
+        save_file.write(dumps(routine))
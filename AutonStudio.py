@@ -1,11 +1,22 @@
-import math
+import os
 import time
 
-import PySimpleGUI as sg
+# Imports are deferred until they are needed so the title window shows up as fast as possible,
+# the studio's modules (and NumPy with them) are only imported once the studio is first opened
+startTime = time.perf_counter()
 
-import HelperFunctions as hf
+# Seconds without a keystroke after which the text typed into a path or turn entry field is applied
+INPUT_DEBOUNCE = 0.1
 
 if __name__ == '__main__':
+    import PySimpleGUI as sg
+
+    import Profiling as pr
+    import Telemetry as te
+
+    te.configure_logging()
+    # Profiles the whole session when AUTON_STUDIO_PROFILE is set, Ctrl+Shift+P in the studio starts and stops it
+    profiler = pr.Profiler.from_environment()
 
     fieldSave_MASTER = None
 
@@ -25,11 +36,13 @@ if __name__ == '__main__':
                         size=[32, 1])], [logo, sg.Column(menu_column)]]
 
     title_window = sg.Window('Auton Studio', layout2)
+    title_window.finalize()
+    te.log.info('Time to first window: %.0f ms', (time.perf_counter() - startTime) * 1000)
 
     # f = open("testFile.txt", "x") This can be used to create a file. Very easy. Nice.
 
     # Fields used during the loop
-    drivetrain = '[Mechanum with Odometry]'
+    drivetrain = 'Mechanum with Odometry'
     robotSize_X = None
     robotSize_Y = None
     fieldConfiguration = 'None'
@@ -37,35 +50,58 @@ if __name__ == '__main__':
     selectedOperation = None
     pathEditUpdated = False
     turnEditUpdated = False
-    startPoint_circle = None
-    startPoint_line = None
-    robot_rectangle = None
     robot_line1 = None
     robot_line2 = None
     robot_line3 = None
     robot_line4 = None
-    robot_point = None
-    robot_polygon = None
-    point_lines = []
     turn_circles = []
     delete_point_circles = []
     delete_turn_circles = []
-    turnIndicator_circles = []
-    turnIndicator_text = []
-    points = []
-    turns = []
-    velocities = []
     defaultVelocity = 48
-    convertedPoints = []
-    pathStrings = [None]
-    turnStrings = [None]
+    path = None
+    shownPathVersion = None
+    shownTurnVersion = None
+    shownRoutineTime = None
+    robotCorners = None
+    # Paths during which the robot hits a wall or field element, and what they were checked for
+    collidingPaths = set()
+    checkedCollisions = None
+    # Alliance partner (or opponent) routines shown and simulated next to ours, keyed by file name, as
+    # (PathModel, robot corners, drivetrain), their trajectories keyed by file name and drivetrain, and the times at which
+    # two robots run into each other
+    partners = {}
+    partnerTrajectories = {}
+    routineTrajectory = None
+    robotConflicts = []
+    checkedConflicts = None
     selectedPathNum = None
     selectedTurnNum = None
-    startHeading = 0.0
-    export_file = open('AutonPath.java', 'w')
+    # Which points a click on the field can pick in each operation
+    pickablePoints = {'deletingPoint': lambda i: i > 0,
+                      'deletingTurn': lambda i: i in path.turns,
+                      'addingTurn': lambda i: i not in path.turns}
     fieldSaves = []
     fieldSaves_NAMES = []
     saves = {}
+    # The studio window is built once and hidden while the title and configuration windows are shown
+    studio_window = None
+    drawnFieldConfiguration = None
+    fieldFigures = []
+    # Trajectories being simulated and the frame of each that is on screen, keyed by robot
+    simulatedTrajectories = {}
+    simulationFrames = {}
+    # Set by Simulate Robot Run, the run starts once the routine's trajectory is compiled
+    simulationRequested = False
+    # Path and turn versions of the routine being optimized, None while no search is running
+    optimizedVersion = None
+    # Times every studio event when AUTON_STUDIO_TELEMETRY is set, see Telemetry
+    telemetry = None
+    # Keystrokes in these entry fields are only applied once no key was typed for INPUT_DEBOUNCE seconds, the
+    # field being typed into and when its edit is due
+    debouncedInputs = ('-START_X_INPUT-', '-START_Y_INPUT-', '-FINAL_X_INPUT-', '-FINAL_Y_INPUT-', '-VELOCITY_INPUT-',
+                       '-ANGLE_INPUT-')
+    pendingInput = None
+    pendingInputDue = 0.0
 
 
 
@@ -79,22 +115,24 @@ if __name__ == '__main__':
 
         changingWindow = False
 
-
-        print(str(event0))
+        te.log.debug('Title window event %s', event0)
 
         if event0 is None or event0 == 'Exit:':
             break
 
-        if event0 == '-DRIVETRAIN_SELECTION-':
-            drivetrain = values0
+        if event0 == '-DRIVETRAIN_SELECTION-' and len(values0['-DRIVETRAIN_SELECTION-']) > 0:
+            drivetrain = values0['-DRIVETRAIN_SELECTION-'][0]
 
         if not configWindowActive and event0 == '-CONFIG_BUTTON-':
             configWindowActive = True
+            import Coordinates as co
 
 
 
             configLayout = [[sg.Button('Test Button')]]
-            canvas = sg.Graph(canvas_size=[300, 300], graph_bottom_left=[0, 0], graph_top_right=[350, 350],
+            canvasLength = co.CONFIG_CANVAS.field_length_pixels
+            canvas = sg.Graph(canvas_size=[300, 300], graph_bottom_left=[0, 0],
+                              graph_top_right=[canvasLength, canvasLength],
                               background_color=None, key='-CANVAS-', enable_events=True)
 
             options_tab0 = [[sg.Text('\n\n\n')], [sg.Button('Add Servo', key='-ADD_SERVO_BUTTON-', font='verdana')],
@@ -118,7 +156,7 @@ if __name__ == '__main__':
 
 
             canvas.draw_rectangle([2, 2], [348, 348], line_color='black', line_width=5)
-            canvas.draw_line([13, 20], [337, 20], color='black', width=2)  # 18 pixels is one inch
+            canvas.draw_line([13, 20], [13 + co.CONFIG_CANVAS.length_to_pixels(18), 20], color='black', width=2)
             canvas.draw_text('18 in.', [162, 13], color='black' , font='Verdana 7 bold')
 
             while True and configWindowActive:
@@ -141,8 +179,8 @@ if __name__ == '__main__':
                 if eventC == '-UPDATE_CONFIG-' and valuesC['-ROBOT_SIZE_X-'] != '' and valuesC['-ROBOT_SIZE_Y-'] !='':
                     if configRobot_rectangle is not None:
                         canvas.delete_figure(configRobot_rectangle)
-                    robotSize_X = int(valuesC['-ROBOT_SIZE_X-']) * 18
-                    robotSize_Y = int(valuesC['-ROBOT_SIZE_Y-']) * 18
+                    robotSize_X = co.CONFIG_CANVAS.length_to_pixels(int(valuesC['-ROBOT_SIZE_X-']))
+                    robotSize_Y = co.CONFIG_CANVAS.length_to_pixels(int(valuesC['-ROBOT_SIZE_Y-']))
                     configRobot_rectangle = canvas.draw_rectangle([173 - robotSize_X/2, 173 + robotSize_Y/2], [173 + robotSize_X/2, 173 - robotSize_Y/2], line_width=3)
 
                 if eventC == '-FIELD_DD-':
@@ -159,174 +197,259 @@ if __name__ == '__main__':
             title_window.Hide()
             studioWindowActive = True
 
-            pathInfo = sg.Text('None', key='-PATH_INFO-', size=[20, 1], font='verdana')
-            turnInfo = sg.Text('None', key='-TURN_INFO-', size=[20, 1], font='verdana')
-            savesInfo = sg.Text('None', key='-SAVE_INFO-', size=[20, 1], font='verdana')
-
-            # Each inch is five pixels
-            field = sg.Graph(canvas_size=[720, 720], graph_bottom_left=[0, 0], graph_top_right=[720, 720],
-                                 background_color='#BAB8B8', key='-FIELD-', enable_events=True)
-            fieldSave_MASTER = field
-
-            paths_tab = [[sg.Listbox(values=[], size=(50, 6), key='-PATH_LIST-')],
-                         [sg.Button('Edit Path', key='-EDIT_PATH_BUTTON-', font='verdana'),
-                          sg.Button('Round All', key='-ROUND_ALL_BUTTON-', font='verdana')],
-                         [sg.Text('Selected Path:', font='verdana'), pathInfo],
-                         [sg.Text('Start X', key='-START_X_TEXT-', font='verdana'),
-                          sg.InputText(enable_events=True, size=[10, 1], key='-START_X_INPUT-', font='verdana'),
-                          sg.Text('   Start Y', key='-START_Y_TEXT-', font='verdana'),
-                          sg.InputText(enable_events=True, size=[10, 1], key='-START_Y_INPUT-', font='verdana')],
-                         [sg.Text('Final X', key='-FINAL_X_TEXT-', font='verdana'),
-                          sg.InputText(enable_events=True, size=[10, 1], key='-FINAL_X_INPUT-', font='verdana'),
-                          sg.Text('   Final Y', key='-FINAL_Y_TEXT-', font='verdana'),
-                          sg.InputText(enable_events=True, size=[10, 1], key='-FINAL_Y_INPUT-', font='verdana')],
-                         [sg.Text('Velocity', font='verdana'), sg.InputText(enable_events=True, size=[10, 1], key='-VELOCITY_INPUT-', font='verdana')],
-                         [sg.Button('Deselect', key='-DESELECT_BUTTON-', font='verdana')]]
-
-            turns_tab = [[sg.Listbox(values=[], size=(50, 6), key='-TURN_LIST-', font='verdana')],
-                         [sg.Button('Edit Turn', key='-EDIT_TURN_BUTTON-', font='verdana')],
-                         [sg.Text('Selected Turn:', font='verdana'), turnInfo],
-                         [sg.Text('Angle', key='-ANGLE_TEXT-', font='verdana'),
-                          sg.InputText(enable_events=True, size=[10, 1], key='-ANGLE_INPUT-', font='verdana')]]
-
-            saves_tab = [[sg.Listbox(values=[], size=(50, 4), key='-SAVES_LIST-', font='verdana')],
-                         [sg.Button('Select Save', key='-SELECT_SAVE_BUTTON-', font='verdana')],
-                          [sg.Text('Selected Turn:', font='verdana')]]
-
-            editing_tabGroup = sg.TabGroup(
-                layout=[[sg.Tab(layout=paths_tab, title='Paths', font='Verdana'), sg.Tab(layout=turns_tab, title='Turns', font='Verdana 10 bold')]])
-
-            saves_tabGroup = sg.TabGroup(layout=[[sg.Tab(layout=saves_tab, title='Saves')]])
-
-            main_column = [[sg.Button('Save Field', key='-SAVE_BUTTON-', font='verdana'), sg.Button('Load Field', key='-LOAD_BUTTON-', font='verdana')],
-                           [sg.Button('Set Start Point', key='-START_POINT_BUTTON-', font='verdana')],
-                           [sg.Button('Add Point', key='-ADD_POINT_BUTTON-', font='verdana'), sg.Button('Delete Point', key='-DELETE_POINT_BUTTON-', font='verdana')],
-                           [sg.Button('Add Turn', key='-ADD_TURN_BUTTON-', font='verdana'), sg.Button('Delete Turn', key='-DELETE_TURN_BUTTON-', font='verdana')],
-                           [sg.Button('Add Robot Operation', font='verdana')],
-                           [sg.Button('Simulate Robot Run', key='-SIMULATE_BUTTON-', font='verdana')],
-                           [sg.Text('\nEdit Menu:', font='verdana')],
-                           [editing_tabGroup],
-                           [sg.Text('Selected Drivetrain: ' + drivetrain[drivetrain.index('['): drivetrain.index(']') + 1], font='verdana')],
-                           [sg.Button('Clear Field', key='-CLEAR_FIELD_BUTTON-', font='verdana')],
-                           [sg.Button('Export Field', key='-EXPORT_BUTTON-', font='verdana')]]
-
-            layout = [[sg.Text('Field Configuration: ' + fieldConfiguration, font='Verdana 16 bold')], [field, sg.Column(main_column)],
-                      [sg.Button('Back', key='-BACK_BUTTON-', font='verdana'), sg.Button('Go to Configuration Menu', key='-GOTO_CONFIG_BUTTON-', font='verdana'),
-                       sg.Button('Exit', font='verdana')]]
-            studio_window = sg.Window('EXPERIMENTAL GUI', layout)
-
-            studio_window.finalize()
-
-            # Hide certain elements
-            studio_window['-START_X_TEXT-'].hide_row()
-            studio_window['-FINAL_X_TEXT-'].hide_row()
-            studio_window['-VELOCITY_INPUT-'].hide_row()
-            studio_window['-DESELECT_BUTTON-'].hide_row()
-            studio_window['-ANGLE_TEXT-'].hide_row()
-
-            for z in range(1, 31):
-                field.draw_line([24 * z, 720], [24 * z, 0], 'light grey')
-                field.draw_line([0, 24 * z], [720, 24 * z], 'light grey')
-            for x in range(1, 6):
-                field.draw_line([120 * x, 720], [120 * x, 0], 'black')
-                field.draw_line([0, 120 * x], [720, 120 * x], 'black')
-
-            if fieldConfiguration == 'FTC Skystone':
-                field.draw_line([0,120], [120,120], width=6, color='red')
-                field.draw_line([120, 0], [120, 120], width=6, color='red')
-
-                field.draw_line([0, 600], [120, 720], width=6, color='blue')
-
-                field.draw_line([600, 720], [720, 600], width=6, color='red')
-
-                field.draw_line([0, 360], [240, 360], width=6, color='blue')
-
-                field.draw_line([480, 360], [720, 360], width=6, color='red')
-
-                field.draw_line([240, 365], [480, 365], width=6, color='yellow')
-                field.draw_line([0, 360], [240, 360], width=6, color='blue')
-
-                field.draw_line([600, 120], [720, 120], width=6, color='blue')
-                field.draw_line([600, 0], [600, 120], width=6, color='blue')
-
-                field.draw_rectangle([240, 320], [480, 400], fill_color='#28292B')
-
-                field.draw_line([240, 365], [480, 365], width=3, color='yellow')
-                field.draw_line([240, 355], [480, 355], width=3, color='yellow')
-
-                field.draw_rectangle([240, 690], [332.5, 517.5], fill_color='blue')
-                field.draw_rectangle([387.5, 690], [480, 517.5], fill_color='red')
-
-                field.draw_rectangle([241, 240],[261, 0], fill_color='yellow', line_width=0)
-                for y in range(0, 7):
-                    field.draw_line([241, y*40],[261, y*40], width=0.5)
+            if studio_window is None:
+                studioStartTime = time.perf_counter()
+                import AutonFile as af
+                import Collision as cl
+                import Coordinates as co
+                import Curves as cu
+                import FieldBackground as fb
+                import FieldRenderer as fr
+                import HelperFunctions as hf
+                import History as hi
+                import JavaExporter as je
+                import MotionProfile as mp
+                import Optimizer as op
+                import PathModel as pm
+                import Simplify as si
+                import SimulationWorker as sw
+                import Trajectory as traj
+
+                path = pm.PathModel(co.FIELD, default_velocity=defaultVelocity)
+                history = hi.History(path)
+
+                pathInfo = sg.Text('None', key='-PATH_INFO-', size=[20, 1], font='verdana')
+                turnInfo = sg.Text('None', key='-TURN_INFO-', size=[20, 1], font='verdana')
+                savesInfo = sg.Text('None', key='-SAVE_INFO-', size=[20, 1], font='verdana')
+
+                # Each inch is five pixels
+                fieldLength = co.FIELD.field_length_pixels
+                field = sg.Graph(canvas_size=[fieldLength, fieldLength], graph_bottom_left=[0, 0],
+                                 graph_top_right=[fieldLength, fieldLength],
+                                     background_color='#BAB8B8', key='-FIELD-', enable_events=True, motion_events=True)
+                fieldSave_MASTER = field
+
+                paths_tab = [[sg.Listbox(values=[], size=(50, 6), key='-PATH_LIST-')],
+                             [sg.Button('Edit Path', key='-EDIT_PATH_BUTTON-', font='verdana'),
+                              sg.Button('Round All', key='-ROUND_ALL_BUTTON-', font='verdana'),
+                              sg.Combo(list(co.SNAP_MODES), default_value='1 in', readonly=True, key='-SNAP_MODE-',
+                                       font='verdana'),
+                              sg.Button('Mirror Alliance', key='-MIRROR_BUTTON-', font='verdana'),
+                              sg.Button('Optimize', key='-OPTIMIZE_BUTTON-', font='verdana'),
+                              sg.Button('Simplify', key='-SIMPLIFY_BUTTON-', font='verdana')],
+                             [sg.Text('Selected Path:', font='verdana'), pathInfo],
+                             [sg.Text('Start X', key='-START_X_TEXT-', font='verdana'),
+                              sg.InputText(enable_events=True, size=[10, 1], key='-START_X_INPUT-', font='verdana'),
+                              sg.Text('   Start Y', key='-START_Y_TEXT-', font='verdana'),
+                              sg.InputText(enable_events=True, size=[10, 1], key='-START_Y_INPUT-', font='verdana')],
+                             [sg.Text('Final X', key='-FINAL_X_TEXT-', font='verdana'),
+                              sg.InputText(enable_events=True, size=[10, 1], key='-FINAL_X_INPUT-', font='verdana'),
+                              sg.Text('   Final Y', key='-FINAL_Y_TEXT-', font='verdana'),
+                              sg.InputText(enable_events=True, size=[10, 1], key='-FINAL_Y_INPUT-', font='verdana')],
+                             [sg.Text('Velocity', font='verdana'), sg.InputText(enable_events=True, size=[10, 1], key='-VELOCITY_INPUT-', font='verdana'),
+                              sg.Text('   Shape', font='verdana'),
+                              sg.Combo(list(cu.SEGMENT_TYPES), default_value='Line', readonly=True, enable_events=True,
+                                       key='-SEGMENT_TYPE-', font='verdana')],
+                             [sg.Button('Deselect', key='-DESELECT_BUTTON-', font='verdana')]]
+
+                turns_tab = [[sg.Listbox(values=[], size=(50, 6), key='-TURN_LIST-', font='verdana')],
+                             [sg.Button('Edit Turn', key='-EDIT_TURN_BUTTON-', font='verdana')],
+                             [sg.Text('Selected Turn:', font='verdana'), turnInfo],
+                             [sg.Text('Angle', key='-ANGLE_TEXT-', font='verdana'),
+                              sg.InputText(enable_events=True, size=[10, 1], key='-ANGLE_INPUT-', font='verdana')]]
+
+                saves_tab = [[sg.Listbox(values=[], size=(50, 4), key='-SAVES_LIST-', font='verdana')],
+                             [sg.Button('Select Save', key='-SELECT_SAVE_BUTTON-', font='verdana')],
+                              [sg.Text('Selected Turn:', font='verdana')]]
+
+                editing_tabGroup = sg.TabGroup(
+                    layout=[[sg.Tab(layout=paths_tab, title='Paths', font='Verdana'), sg.Tab(layout=turns_tab, title='Turns', font='Verdana 10 bold')]])
+
+                saves_tabGroup = sg.TabGroup(layout=[[sg.Tab(layout=saves_tab, title='Saves')]])
+
+                main_column = [[sg.Button('Save Field', key='-SAVE_BUTTON-', font='verdana'), sg.Button('Load Field', key='-LOAD_BUTTON-', font='verdana')],
+                               [sg.Button('Set Start Point', key='-START_POINT_BUTTON-', font='verdana')],
+                               [sg.Button('Add Point', key='-ADD_POINT_BUTTON-', font='verdana'), sg.Button('Delete Point', key='-DELETE_POINT_BUTTON-', font='verdana')],
+                               [sg.Button('Add Turn', key='-ADD_TURN_BUTTON-', font='verdana'), sg.Button('Delete Turn', key='-DELETE_TURN_BUTTON-', font='verdana')],
+                               [sg.Button('Add Robot Operation', font='verdana')],
+                               [sg.Button('Simulate Robot Run', key='-SIMULATE_BUTTON-', font='verdana'),
+                                sg.Combo(['0.25x', '0.5x', '1x', '2x', '4x', '8x'], default_value='1x', readonly=True,
+                                         enable_events=True, key='-SIMULATION_SPEED-', font='verdana')],
+                               [sg.Button('Pause', key='-PAUSE_SIMULATION_BUTTON-', font='verdana'),
+                                sg.Button('Stop', key='-STOP_SIMULATION_BUTTON-', font='verdana'),
+                                sg.Slider(range=(0, 100), orientation='h', size=(20, 15), enable_events=True,
+                                          disable_number_display=True, key='-SIMULATION_SEEK-')],
+                               [sg.Text('\nEdit Menu:', font='verdana')],
+                               [editing_tabGroup],
+                               [sg.Text('Selected Drivetrain: [' + drivetrain + ']', key='-DRIVETRAIN_TEXT-', size=[45, 1], font='verdana')],
+                               [sg.Text('Routine Time: 0.00 s', key='-ROUTINE_TIME-', size=[45, 1], font='verdana')],
+                               [sg.Button('Add Partner Routine', key='-ADD_PARTNER_BUTTON-', font='verdana'),
+                                sg.Combo(list(mp.DRIVETRAIN_LIMITS), default_value=drivetrain, readonly=True,
+                                         key='-PARTNER_DRIVETRAIN-', font='verdana'),
+                                sg.Button('Clear Partners', key='-CLEAR_PARTNERS_BUTTON-', font='verdana')],
+                               [sg.Text('Robot Conflicts: None', key='-ROBOT_CONFLICTS-', size=[45, 2], font='verdana')],
+                               [sg.Button('Undo', key='-UNDO_BUTTON-', font='verdana'), sg.Button('Redo', key='-REDO_BUTTON-', font='verdana')],
+                               [sg.Button('Clear Field', key='-CLEAR_FIELD_BUTTON-', font='verdana')],
+                               [sg.Button('Export Field', key='-EXPORT_BUTTON-', font='verdana')]]
+
+                layout = [[sg.Text('Field Configuration: ' + fieldConfiguration, key='-FIELD_CONFIG_TEXT-', size=[40, 1], font='Verdana 16 bold')], [field, sg.Column(main_column)],
+                          [sg.Button('Back', key='-BACK_BUTTON-', font='verdana'), sg.Button('Go to Configuration Menu', key='-GOTO_CONFIG_BUTTON-', font='verdana'),
+                           sg.Button('Exit', font='verdana')]]
+                studio_window = sg.Window('EXPERIMENTAL GUI', layout)
+
+                studio_window.finalize()
+                studio_window.bind('<Control-z>', '-UNDO_BUTTON-')
+                studio_window.bind('<Control-y>', '-REDO_BUTTON-')
+                scene = fr.FieldScene(field)
+                telemetry = te.Telemetry.from_environment(scene)
+                studio_window.bind('<F9>', '-TELEMETRY_REPORT-')
+                studio_window.bind('<Control-Shift-P>', '-PROFILE_TOGGLE-')
+                simulation = sw.SimulationWorker(studio_window)
+
+                # Hide certain elements
+                studio_window['-START_X_TEXT-'].hide_row()
+                studio_window['-FINAL_X_TEXT-'].hide_row()
+                studio_window['-VELOCITY_INPUT-'].hide_row()
+                studio_window['-DESELECT_BUTTON-'].hide_row()
+                studio_window['-ANGLE_TEXT-'].hide_row()
+                te.log.info('Studio window built in %.0f ms', (time.perf_counter() - studioStartTime) * 1000)
+            else:
+                studio_window.UnHide()
+            shownPathVersion = None
+            shownTurnVersion = None
+            shownRoutineTime = None
+            # The robot size entered in the configuration menu, in pixels of the config canvas
+            robotCorners = traj.ROBOT_CORNERS
+            if robotSize_X is not None and robotSize_Y is not None:
+                robotCorners = traj.robot_corners(co.CONFIG_CANVAS.length_to_inches(robotSize_X),
+                                                  co.CONFIG_CANVAS.length_to_inches(robotSize_Y), co.FIELD)
+            studio_window['-FIELD_CONFIG_TEXT-'].update('Field Configuration: ' + fieldConfiguration)
+            studio_window['-DRIVETRAIN_TEXT-'].update('Selected Drivetrain: [' + drivetrain + ']')
+
+            # The static field is a single pre-rendered image per field configuration, it is only redrawn when the
+            # configuration changed since it was last drawn and it is kept below the path figures
+            if drawnFieldConfiguration != fieldConfiguration:
+                for figure in fieldFigures:
+                    field.delete_figure(figure)
+                fieldFigures = fb.draw_field(field, fieldConfiguration)
+                drawnFieldConfiguration = fieldConfiguration
 
 
         while True and studioWindowActive:  # Event Loop
-            event1, values1 = studio_window.read()  # can also be written as event, values = window()
-
-            # Print to console the event and values
-            print('Event:')
-            print(event1)
-            print('Values:')
-            print(values1)
-            print()
+            readTimeout = None
+            if pendingInput is not None:
+                readTimeout = max(int((pendingInputDue - time.perf_counter()) * 1000), 0)
+            event1, values1 = studio_window.read(timeout=readTimeout)  # can also be written as event, values = window()
+
+            # Hold back keystrokes until typing pauses, then handle the field's final text as a single edit. Any
+            # other click, key or field applies the held back edit first and is queued again to be handled after it
+            if event1 in debouncedInputs and pendingInput in (None, event1):
+                pendingInput = event1
+                pendingInputDue = time.perf_counter() + INPUT_DEBOUNCE
+                continue
+            if event1 == sg.TIMEOUT_KEY:
+                if pendingInput is None or time.perf_counter() < pendingInputDue:
+                    continue
+                event1, pendingInput = pendingInput, None
+            elif pendingInput is not None and event1 not in (None, '-FIELD-+MOVE', sw.FRAME_EVENT):
+                studio_window.write_event_value(event1, values1.get(event1))
+                event1, pendingInput = pendingInput, None
+            telemetry.begin(event1)
+
+            # Highlight the point under the mouse that a click would pick in the current operation
+            if event1 == '-FIELD-+MOVE':
+                hoverPoint = None
+                if selectedOperation in pickablePoints:
+                    hoverPoint = path.grid.nearest(values1['-FIELD-'][0], values1['-FIELD-'][1], 10,
+                                                   accept=pickablePoints[selectedOperation])
+                if hoverPoint is None:
+                    scene.remove('hover')
+                else:
+                    scene.circle('hover', path.points[hoverPoint], 12, line_color='yellow')
+                telemetry.end()
+                continue
+
+            # Move the simulated robots to the frames the simulation worker says are due
+            if event1 == sw.FRAME_EVENT:
+                simulationFrames.update(simulation.take_frames())
+                for robot, j in simulationFrames.items():
+                    scene.polygon(('robot', robot), simulatedTrajectories[robot].corners(j), line_color='black',
+                                  line_width='3', fill_color='')
+                    scene.point(('robot_point', robot), simulatedTrajectories[robot].front_point(j), size=15,
+                                color='yellow')
+                telemetry.end()
+                continue
+
+            te.log.debug('Event %s values %s', event1, values1)
+
+            if event1 == '-TELEMETRY_REPORT-' and telemetry.enabled:
+                te.log.info('Event timings:\n%s', telemetry.report())
+                telemetry.dump()
+
+            if event1 == '-PROFILE_TOGGLE-':
+                profiler.toggle()
 
             # Exit Condition
             if event1 is None or event1 == 'Exit':
+                simulation.close()
                 studio_window.close()
                 title_window.close()
                 break
 
+            # Playback does not carry on while the studio is hidden
+            if event1 in ('-GOTO_CONFIG_BUTTON-', '-BACK_BUTTON-', '-CLEAR_FIELD_BUTTON-', '-STOP_SIMULATION_BUTTON-'):
+                simulation.stop()
+                simulatedTrajectories = {}
+                simulationFrames = {}
+
             if event1 =='-GOTO_CONFIG_BUTTON-':
                 studioWindowActive = False
                 configWindowActive = False
                 studio_window.Hide()
                 changingWindow = True
                 event0 = '-CONFIG_BUTTON-'
-                print(str(event1))
                 break
 
 
             # Back Condition
             if event1 is None or event1 == '-BACK_BUTTON-':
                 studioWindowActive = False
-                studio_window.Close()
+                studio_window.Hide()
                 title_window.UnHide()
                 fieldSave = field
                 break
 
             # Clears all field elements and paths
-            if event1 == '-CLEAR_FIELD_BUTTON-' and len(points) > 0:
-                field.delete_figure(robot_rectangle)
-                field.delete_figure(robot_polygon)
-                field.delete_figure(robot_point)
-                field.delete_figure(startPoint_circle)
+            if event1 == '-CLEAR_FIELD_BUTTON-' and len(path.points) > 0:
+                scene.clear()
                 for tc in turn_circles:
                     field.delete_figure(tc)
-                for tic in turnIndicator_circles:
-                    field.delete_figure(tic)
-                field.delete_figure(startPoint_line)
-                for pl in point_lines:
-                    field.delete_figure(pl)
-                for tit in turnIndicator_text:
-                    field.delete_figure(tit)
-                points.clear()
-                point_lines.clear()
                 turn_circles.clear()
-                turnIndicator_circles.clear()
-                turnIndicator_text.clear()
-                turns.clear()
-                convertedPoints.clear()
-                pathStrings.clear()
-                turnStrings.clear()
+                history.do('clear')
+                selectedPathNum = None
+                selectedTurnNum = None
+                pathEditUpdated = False
+                turnEditUpdated = False
                 fieldSave = None
 
+            # Undo or redo the last edit, the selected path and turn may no longer exist afterwards
+            if event1 in ('-UNDO_BUTTON-', '-REDO_BUTTON-'):
+                if event1 == '-UNDO_BUTTON-':
+                    history.undo()
+                else:
+                    history.redo()
+                if selectedPathNum is not None and selectedPathNum >= len(path.points):
+                    selectedPathNum = None
+                if selectedTurnNum is not None and selectedTurnNum > len(path.turns):
+                    selectedTurnNum = None
+                pathEditUpdated = False
+                turnEditUpdated = False
+
             # Choose which path to edit
             if event1 == '-EDIT_PATH_BUTTON-':
                 counter = 0
                 pathEditUpdated = False
-                for p in pathStrings:
+                for p in path.path_strings():
                     counter += 1
                     if len(values1['-PATH_LIST-']) > 0 and values1['-PATH_LIST-'][0] == p:
                         studio_window['-PATH_INFO-'].update('Path #' + str(counter))
@@ -338,36 +461,110 @@ if __name__ == '__main__':
                 studio_window['-FINAL_X_TEXT-'].unhide_row()
                 studio_window['-VELOCITY_INPUT-'].unhide_row()
                 studio_window['-DESELECT_BUTTON-'].unhide_row()
-                studio_window['-START_X_INPUT-'].update(value=convertedPoints[selectedPathNum - 1][0])
-                studio_window['-START_Y_INPUT-'].update(value=convertedPoints[selectedPathNum - 1][1])
-                studio_window['-FINAL_X_INPUT-'].update(value=convertedPoints[selectedPathNum][0])
-                studio_window['-FINAL_Y_INPUT-'].update(value=convertedPoints[selectedPathNum][1])
-                studio_window['-VELOCITY_INPUT-'].update(value=velocities[selectedPathNum - 1])
+                studio_window['-START_X_INPUT-'].update(value=path.converted_point(selectedPathNum - 1)[0])
+                studio_window['-START_Y_INPUT-'].update(value=path.converted_point(selectedPathNum - 1)[1])
+                studio_window['-FINAL_X_INPUT-'].update(value=path.converted_point(selectedPathNum)[0])
+                studio_window['-FINAL_Y_INPUT-'].update(value=path.converted_point(selectedPathNum)[1])
+                studio_window['-VELOCITY_INPUT-'].update(value=path.velocities[selectedPathNum - 1])
+                studio_window['-SEGMENT_TYPE-'].update(value=cu.SEGMENT_NAMES[int(path.segments[selectedPathNum - 1])])
                 pathEditUpdated = True
             # Change the values of a point based on what was entered into the entry field
-            if pathEditUpdated:
-                if event1 == '-START_X_INPUT-':
-                    points[selectedPathNum - 1][0] = float(hf.clean_coordinates(values1['-START_X_INPUT-'])) * 5 + (
-                                720 / 2)
-                elif event1 == '-START_Y_INPUT-':
-                    points[selectedPathNum - 1][1] = float(hf.clean_coordinates(values1['-START_Y_INPUT-'])) * 5 + (
-                                720 / 2)
-                elif event1 == '-FINAL_X_INPUT-':
-                    points[selectedPathNum][0] = float(hf.clean_coordinates(values1['-FINAL_X_INPUT-'])) * 5 + (720 / 2)
-                elif event1 == '-FINAL_Y_INPUT-':
-                    points[selectedPathNum][1] = float(hf.clean_coordinates(values1['-FINAL_Y_INPUT-'])) * 5 + (720 / 2)
-                elif event1 == '-VELOCITY_INPUT-':
-                    velocities[selectedPathNum - 1] = float(hf.clean_coordinates(values1['-VELOCITY_INPUT-']))
-
-            # Rounds all the points to the nearest inch
+            if pathEditUpdated and selectedPathNum is not None:
+                # Text that is not a number (yet), like a lone '-', leaves the path as it is
+                number = hf.parse_number(values1[event1]) if event1 in debouncedInputs else None
+                if event1 == '-START_X_INPUT-' and number is not None:
+                    history.do('move_point', selectedPathNum - 1, path.coordinates.axis_to_pixels(number),
+                               path.points[selectedPathNum - 1][1],
+                               merge_key=(event1, selectedPathNum))
+                elif event1 == '-START_Y_INPUT-' and number is not None:
+                    history.do('move_point', selectedPathNum - 1, path.points[selectedPathNum - 1][0],
+                               path.coordinates.axis_to_pixels(number),
+                               merge_key=(event1, selectedPathNum))
+                elif event1 == '-FINAL_X_INPUT-' and number is not None:
+                    history.do('move_point', selectedPathNum, path.coordinates.axis_to_pixels(number),
+                               path.points[selectedPathNum][1],
+                               merge_key=(event1, selectedPathNum))
+                elif event1 == '-FINAL_Y_INPUT-' and number is not None:
+                    history.do('move_point', selectedPathNum, path.points[selectedPathNum][0],
+                               path.coordinates.axis_to_pixels(number),
+                               merge_key=(event1, selectedPathNum))
+                # A path is never driven at 0 in/s or less, the motion profile would not move the robot on it
+                elif event1 == '-VELOCITY_INPUT-' and number is not None and number > 0:
+                    history.do('set_velocity', selectedPathNum, number,
+                               merge_key=(event1, selectedPathNum))
+                elif event1 == '-SEGMENT_TYPE-':
+                    history.do('set_segment_type', selectedPathNum, cu.SEGMENT_TYPES[values1['-SEGMENT_TYPE-']])
+
+            # Rounds all the points to the nearest inch, half inch or tile center
             if event1 == '-ROUND_ALL_BUTTON-':
-                for i in range(0, len(convertedPoints)):
-                    points[i][0] = round(convertedPoints[i][0]) * 5 + (720 / 2)
-                    points[i][1] = round(convertedPoints[i][1]) * 5 + (720 / 2)
+                history.do('snap', values1['-SNAP_MODE-'])
+
+            # Flips the routine to the other alliance's side of the field
+            if event1 == '-MIRROR_BUTTON-':
+                history.do('mirror')
+
+            # Search for a faster collision free version of the routine, applied as one edit that can be undone. The
+            # search runs on a background thread so the studio stays usable, its result is only offered when the
+            # routine was not edited in the meantime
+            if event1 == '-OPTIMIZE_BUTTON-' and len(path.points) > 2 and optimizedVersion is None:
+                optimizedVersion = (path.path_version, path.turn_version)
+                studio_window['-OPTIMIZE_BUTTON-'].update('Optimizing...', disabled=True)
+                op.start_optimizing(studio_window, path.points.copy(), list(path.turns), path.velocities.copy(),
+                                    path.start_heading, mp.DRIVETRAIN_LIMITS[drivetrain],
+                                    cl.obstacles_for(fieldConfiguration), robotCorners, path.segments.copy(),
+                                    path.handles.copy())
+            if event1 == op.RESULT_EVENT:
+                result = values1[op.RESULT_EVENT]
+                studio_window['-OPTIMIZE_BUTTON-'].update('Optimize', disabled=False)
+                if optimizedVersion != (path.path_version, path.turn_version):
+                    sg.Popup('The routine was edited while it was optimized, optimize it again')
+                elif result.collisions_after > 0:
+                    sg.Popup(f'No collision free routine was found, the best one still has '
+                             f'{result.collisions_after} footprints hitting the field '
+                             f'({result.collisions_before} now)')
+                elif result.collisions_before > 0 or result.time_after < result.time_before:
+                    choice = sg.PopupYesNo(f'Routine time {result.time_before:.2f} s -> {result.time_after:.2f} s\n'
+                                           f'Footprints hitting the field {result.collisions_before} -> 0\n'
+                                           f'Apply the optimized routine?')
+                    if choice == 'Yes':
+                        history.do('load', result.points, result.turns, result.velocities, path.start_heading,
+                                   path.segments.copy(), path.handles.copy())
+                        selectedPathNum = None
+                        selectedTurnNum = None
+                        pathEditUpdated = False
+                        turnEditUpdated = False
+                else:
+                    sg.Popup('No faster routine was found')
+                optimizedVersion = None
+
+            # Drop waypoints on nearly straight runs and turns to the heading the robot already has
+            if event1 == '-SIMPLIFY_BUTTON-' and len(path.points) > 1:
+                tolerance = hf.parse_number(sg.PopupGetText('Largest distance in inches a waypoint may be moved off '
+                                                            'the route', title='Simplify',
+                                                            default_text=f'{si.DEFAULT_TOLERANCE:g}'))
+                if tolerance is not None:
+                    simplified = si.simplify(af.Routine(path.points, path.turns, path.velocities, path.start_heading,
+                                                        segments=path.segments, handles=path.handles),
+                                             tolerance, mp.DRIVETRAIN_LIMITS[drivetrain])
+                    if simplified.removed_points + simplified.removed_turns == 0:
+                        sg.Popup('Nothing to simplify')
+                    else:
+                        choice = sg.PopupYesNo(f'{simplified.removed_points} points and {simplified.removed_turns} '
+                                               f'turns can be removed, saving about {simplified.time_saved:.2f} s\n'
+                                               'Apply the simplified routine?')
+                        if choice == 'Yes':
+                            routine = simplified.routine
+                            history.do('load', routine.points, routine.turns, routine.velocities,
+                                       routine.start_heading, routine.segments, routine.handles)
+                            selectedPathNum = None
+                            selectedTurnNum = None
+                            pathEditUpdated = False
+                            turnEditUpdated = False
 
             # Deselect the current path
             if event1 == '-DESELECT_BUTTON-':
                 selectedPathNum = None
+                pathEditUpdated = False
             if selectedPathNum is None:
                 studio_window['-PATH_INFO-'].update('None')
                 studio_window['-START_X_TEXT-'].hide_row()
@@ -379,7 +576,7 @@ if __name__ == '__main__':
             if event1 == '-EDIT_TURN_BUTTON-':
                 counter = 0
                 turnEditUpdated = False
-                for t in turnStrings:
+                for t in path.turn_strings():
                     counter += 1
                     if len(values1['-TURN_LIST-']) > 0 and values1['-TURN_LIST-'][0] == t:
                         studio_window['-TURN_INFO-'].update('Turn #' + str(counter))
@@ -391,81 +588,75 @@ if __name__ == '__main__':
             # Show the entry fields for editing the turn
             if selectedTurnNum is not None and not turnEditUpdated:
                 studio_window['-ANGLE_TEXT-'].unhide_row()
-                studio_window['-ANGLE_INPUT-'].update(value=turns[selectedTurnNum - 1][1])
+                studio_window['-ANGLE_INPUT-'].update(value=path.turns.nth(selectedTurnNum - 1)[1])
                 turnEditUpdated = True
             # Change the angle value of a turn based on what was entered into the entry field
-            if turnEditUpdated:
-                if event1 == '-ANGLE_INPUT-':
-                    turns[selectedTurnNum - 1][1] = float(hf.clean_coordinates(values1['-ANGLE_INPUT-']))
+            if turnEditUpdated and selectedTurnNum is not None:
+                number = hf.parse_number(values1[event1]) if event1 == '-ANGLE_INPUT-' else None
+                if number is not None:
+                    history.do('set_turn_angle', selectedTurnNum, number,
+                               merge_key=(event1, selectedTurnNum))
 
             # Select start point and draw the circle for it and add it to points
             if event1 == '-START_POINT_BUTTON-':
                 selectedOperation = 'selectingStartPoint'
             if selectedOperation == 'selectingStartPoint':
                 if event1 == '-FIELD-':
-                    field.delete_figure(startPoint_circle)
-                    startPoint_circle = field.draw_circle([values1['-FIELD-'][0], values1['-FIELD-'][1]], 5)
-                    if len(points) > 0:
-                        points[0] = ([values1['-FIELD-'][0], values1['-FIELD-'][1]])
-                    else:
-                        points.append([values1['-FIELD-'][0], values1['-FIELD-'][1]])
-                    startHeading = float(hf.clean_coordinates(sg.PopupGetText(
+                    scene.circle('start', [values1['-FIELD-'][0], values1['-FIELD-'][1]], 5)
+                    history.do('set_start_point', values1['-FIELD-'][0], values1['-FIELD-'][1])
+                    heading = hf.parse_number(sg.PopupGetText(
                         message='Enter start heading, 0 is straight up, 90 is to the right, -90 is to the left',
-                        title='Heading selection')))
+                        title='Heading selection'))
+                    history.do('set_start_heading', heading if heading is not None else 0.0)
                     selectedOperation = None
 
             # Select next point and and it to list of points
-            if event1 == '-ADD_POINT_BUTTON-' and len(points) > 0:
+            if event1 == '-ADD_POINT_BUTTON-' and len(path.points) > 0:
                 selectedOperation = 'addingPoint'
             if selectedOperation == 'addingPoint':
                 if event1 == '-FIELD-':
-                    points.append([values1['-FIELD-'][0], values1['-FIELD-'][1]])
-                    velocities.append(defaultVelocity)
+                    history.do('add_point', values1['-FIELD-'][0], values1['-FIELD-'][1])
                     selectedOperation = None
 
-            if event1 == '-DELETE_POINT_BUTTON-' and len(points) > 0:
+            if event1 == '-DELETE_POINT_BUTTON-' and len(path.points) > 0:
                 selectedOperation = 'deletingPoint'
             if selectedOperation == 'deletingPoint':
                 selectedTurnNum = None
                 selectedPathNum = None
+                pathEditUpdated = False
+                turnEditUpdated = False
                 if len(delete_point_circles) == 0:
-                    for p in points[1:]:
+                    for p in path.points[1:]:
                         delete_point_circles.append(field.draw_circle(p, 10, fill_color='red'))
                 if event1 == '-FIELD-':
-                    for p in points[1:]:
-                        if abs(values1['-FIELD-'][0] - p[0]) < 10 and abs(values1['-FIELD-'][1] - p[1]) < 10:
-                            indx = points.index(p)
-                            points.remove(p)
-                            turn_to_remove = None
-                            for t in turns:
-                                if indx == t[0]:
-                                    turn_to_remove = t
-                                if indx < t[0]:
-                                    t[0] = t[0] - 1
-                            if turn_to_remove is not None:
-                                turns.remove(turn_to_remove)
-                            selectedOperation = None
+                    clickedPoint = path.grid.nearest(values1['-FIELD-'][0], values1['-FIELD-'][1], 10,
+                                                     accept=pickablePoints['deletingPoint'])
+                    if clickedPoint is not None:
+                        history.do('delete_point', clickedPoint)
+                        selectedOperation = None
             if not selectedOperation == 'deletingPoint':
                 if len(delete_point_circles) > 0:
                     for c in delete_point_circles:
                         field.delete_figure(c)
                     delete_point_circles.clear()
 
-            if event1 == '-DELETE_TURN_BUTTON-' and len(turns) > 0:
+            if event1 == '-DELETE_TURN_BUTTON-' and len(path.turns) > 0:
                 selectedOperation = 'deletingTurn'
             if selectedOperation == 'deletingTurn':
                 selectedTurnNum = None
                 selectedPathNum = None
+                pathEditUpdated = False
+                turnEditUpdated = False
                 if len(delete_turn_circles) == 0:
-                    for t in turns:
-                        delete_turn_circles.append(field.draw_circle(points[t[0]], 10, fill_color='red'))
+                    for t in path.turns:
+                        delete_turn_circles.append(field.draw_circle(path.points[t[0]], 10, fill_color='red'))
                 if event1 == '-FIELD-':
-                    for t in turns:
-                        if abs(values1['-FIELD-'][0] - points[t[0]][0]) < 10 and abs(values1['-FIELD-'][1] - points[t[0]][1]) < 10:
-                            turns.remove(t)
-                            selectedOperation = None
+                    clickedPoint = path.grid.nearest(values1['-FIELD-'][0], values1['-FIELD-'][1], 10,
+                                                     accept=pickablePoints['deletingTurn'])
+                    if clickedPoint is not None:
+                        history.do('remove_turn', clickedPoint)
+                        selectedOperation = None
             if not selectedOperation == 'deletingTurn':
-                print(len(delete_turn_circles))
                 if len(delete_turn_circles) > 0:
                     for c in delete_turn_circles:
                         field.delete_figure(c)
@@ -476,26 +667,19 @@ if __name__ == '__main__':
                 selectedOperation = 'addingTurn'
             if selectedOperation == 'addingTurn':
                 if len(turn_circles) == 0:
-                    for i in range(0, len(points)):
-                        drawCircle = True
-                        for t in turns:
-                            if t[0] == i:
-                                drawCircle = False
-                        if drawCircle:
-                            turn_circles.append(field.draw_circle(points[i], 10, fill_color='black'))
+                    for i in range(0, len(path.points)):
+                        if i not in path.turns:
+                            turn_circles.append(field.draw_circle(path.points[i], 10, fill_color='black'))
                 if event1 == '-FIELD-':
-                    for i in range(0, len(points)):
-                        allowPointToBeSelected = True
-                        for t in turns:
-                            if t[0] == i:
-                                allowPointToBeSelected = False
-                        if abs(values1['-FIELD-'][0] - points[i][0]) < 10 and abs(values1['-FIELD-'][1] - points[i][1]) < 10 and allowPointToBeSelected:
-                            angle = sg.PopupGetText('Enter turn angle in degrees', title='Turn Angle Entry')
-                            if angle is not None:
-                                turns.append([i, hf.clean_coordinates(angle)])
-                                selectedOperation = None
-                            else:
-                                sg.PopupAnnoying('ERROR: Please enter a value')
+                    clickedPoint = path.grid.nearest(values1['-FIELD-'][0], values1['-FIELD-'][1], 10,
+                                                     accept=pickablePoints['addingTurn'])
+                    if clickedPoint is not None:
+                        angle = hf.parse_number(sg.PopupGetText('Enter turn angle in degrees', title='Turn Angle Entry'))
+                        if angle is not None:
+                            history.do('add_turn', clickedPoint, angle)
+                            selectedOperation = None
+                        else:
+                            sg.PopupAnnoying('ERROR: Please enter a number')
             if not selectedOperation == 'addingTurn':
                 if len(turn_circles) > 0:
                     for c in turn_circles:
@@ -504,122 +688,70 @@ if __name__ == '__main__':
 
 
 
-            # Simulate the robot running through the path
-            if event1 == '-SIMULATE_BUTTON-':
-                selectedOperation = 'simulating'
-            if selectedOperation == 'simulating':
-                prevTurn = None
-                robotCBr = [45, -45]  # Bottom right corner and go clockwise
-                robotCBl = [-45, -45]
-                robotCTl = [-45, 45]
-                robotCTr = [45, 45]
-                robotPolygonPoints = [robotCBr, robotCBl, robotCTl, robotCTr]
-                rot_deltas_final = [[[45], [-45]], [[-45], [-45]], [[-45], [45]], [[45], [45]]]
-                if abs(startHeading - 0.0) > 0:
-                    rot_deltas_final = hf.calculate_rotation_per_frame(points=robotPolygonPoints, angle1=0.0,
-                                                                       angle2=startHeading, degrees_per_second=45,
-                                                                       frames_per_second=60)
-                for i in range(1, len(points)):
-                    deltas = hf.calculate_movement_per_frame(points[i - 1], points[i],
-                                                             inches_per_second=velocities[i - 1], frames_per_second=60,
-                                                             pixels_per_inch=5)
-                    num_movements = math.sqrt(
-                        (points[i][0] - points[i - 1][0]) ** 2 + (points[i][1] - points[i - 1][1]) ** 2) / math.hypot(
-                        deltas[0], deltas[1])
-                    x = points[i - 1][0]
-                    y = points[i - 1][1]
-                    for t in turns:
-                        if t[0] == i - 1:
-                            if prevTurn is None:
-                                angle1 = startHeading
-                            else:
-                                angle1 = prevTurn[1]
-                            robotCBr = [45, -45]  # Bottom right corner and go clockwise
-                            robotCBl = [-45, -45]
-                            robotCTl = [-45, 45]
-                            robotCTr = [45, 45]
-                            robotPolygonPoints = [robotCBr, robotCBl, robotCTl, robotCTr]
-                            rot_deltas = hf.calculate_rotation_per_frame(points=robotPolygonPoints, angle1=angle1,
-                                                                         angle2=t[1], degrees_per_second=45,
-                                                                         frames_per_second=60)
-                            if abs(float(t[1]) - float(angle1)) > 0:
-                                rot_deltas_final = rot_deltas.copy()
-                            prevTurn = t
-                            for j in range(0, len(rot_deltas[0][0]) - 1):
-                                start_time = time.time()
-                                field.delete_figure(robot_polygon)
-                                field.delete_figure(robot_point)
-                                robotCBr = [x + rot_deltas_final[0][0][j],
-                                            y + rot_deltas_final[0][1][j]]  # Bottom right corner and go clockwise
-                                robotCBl = [x + rot_deltas_final[1][0][j], y + rot_deltas_final[1][1][j]]
-                                robotCTl = [x + rot_deltas_final[2][0][j], y + rot_deltas_final[2][1][j]]
-                                robotCTr = [x + rot_deltas_final[3][0][j], y + rot_deltas_final[3][1][j]]
-                                robotPolygonPoints = [robotCBr, robotCBl, robotCTl, robotCTr]
-                                robot_polygon = field.draw_polygon(robotPolygonPoints, line_color='black',
-                                                                   line_width='3', fill_color='')
-                                robotLinePoints = [
-                                    [((robotCTr[0] + robotCBr[0]) / 2.0), ((robotCTr[1] + robotCBr[1]) / 2.0)],
-                                    [((robotCTr[0] + robotCBr[0]) / 2.0) - 20,
-                                     ((robotCTr[1] + robotCBr[1]) / 2.0) - 20]]
-                                robot_point = field.draw_point(point=robotLinePoints[0], color='yellow', size=15)
-                                studio_window.refresh()
-                                sleepTime = 1 / 60 - (time.time() - start_time)
-                                if sleepTime < 0:
-                                    sleepTime = 0
-                                time.sleep(sleepTime)
-                    for j in range(0, int(num_movements)):
-                        start_time = time.time()
-                        x += deltas[0]
-                        y += deltas[1]
-                        field.delete_figure(robot_polygon)
-                        field.delete_figure(robot_point)
-                        robotCBr = [x + rot_deltas_final[0][0][-1],
-                                    y + rot_deltas_final[0][1][-1]]  # Bottom right corner and go clockwise
-                        robotCBl = [x + rot_deltas_final[1][0][-1], y + rot_deltas_final[1][1][-1]]
-                        robotCTl = [x + rot_deltas_final[2][0][-1], y + rot_deltas_final[2][1][-1]]
-                        robotCTr = [x + rot_deltas_final[3][0][-1], y + rot_deltas_final[3][1][-1]]
-                        robotPolygonPoints = [robotCBr, robotCBl, robotCTl, robotCTr]
-                        robot_polygon = field.draw_polygon(robotPolygonPoints, line_color='black', line_width='3',
-                                                           fill_color='')
-                        robotPoint = [((robotCTr[0] + robotCBr[0]) / 2.0), ((robotCTr[1] + robotCBr[1]) / 2.0)]
-                        if startHeading == 0 and rot_deltas_final == [[[45], [-45]], [[-45], [-45]], [[-45], [45]],
-                                                                      [[45], [45]]]:
-                            robotPoint = [((robotCTr[0] + robotCTl[0]) / 2.0), ((robotCTr[1] + robotCTl[1]) / 2.0)]
-                        robot_point = field.draw_point(point=robotPoint, color='yellow', size=15)
-                        studio_window.refresh()
-                        sleepTime = 1 / 60 - (time.time() - start_time)
-                        if sleepTime < 0:
-                            sleepTime = 0
-                        time.sleep(sleepTime)
-                selectedOperation = None
+            # Load another team's routine onto the field, it is drawn in blue and simulated along with ours
+            if event1 == '-ADD_PARTNER_BUTTON-':
+                partner_location = sg.PopupGetFile('Partner routine', no_window=True,
+                                                   file_types=(("Auton Files", "*.auton"),))
+                if partner_location:
+                    try:
+                        routine = af.load(partner_location)
+                    except (OSError, ValueError) as error:
+                        routine = None
+                        sg.Popup('Could not load partner routine: ' + str(error))
+                    if routine is not None and len(routine.points) < 2:
+                        sg.Popup('Partner routine has no paths to drive')
+                    elif routine is not None:
+                        partnerPath = pm.PathModel(co.FIELD)
+                        partnerPath.load(routine.points, routine.turns, routine.velocities, routine.start_heading,
+                                         routine.segments, routine.handles)
+                        partnerCorners = traj.ROBOT_CORNERS
+                        if routine.robot_size is not None:
+                            partnerCorners = traj.robot_corners(routine.robot_size[0], routine.robot_size[1])
+                        partnerName = os.path.basename(partner_location)
+                        partners[partnerName] = (partnerPath, partnerCorners, values1['-PARTNER_DRIVETRAIN-'])
+                        partnerTrajectories = {k: t for k, t in partnerTrajectories.items() if k[0] != partnerName}
+            if event1 == '-CLEAR_PARTNERS_BUTTON-':
+                partners = {}
+                partnerTrajectories = {}
+            # Partner routines do not change, each is compiled once for the drivetrain chosen when it was added
+            for partnerName, (partnerPath, partnerCorners, partnerDrivetrain) in partners.items():
+                if (partnerName, partnerDrivetrain) not in partnerTrajectories:
+                    partnerTrajectories[(partnerName, partnerDrivetrain)] = traj.compile_routine(
+                        partnerPath, mp.DRIVETRAIN_LIMITS[partnerDrivetrain], partnerCorners)
+
+            # Simulate the robot running through the path. Playback runs on the simulation worker's thread and
+            # comes back as frame events, so the studio stays usable during a run. Simulating again (after editing
+            # the path for example) restarts the run with the current path. The run starts once the collision check
+            # below has compiled the routine's trajectory, which is simulated as it is
+            if event1 == '-SIMULATE_BUTTON-' and len(path.points) > 0:
+                simulationRequested = True
+            # A finished run puts the robots back at their start, unless another run was started since
+            if event1 == sw.DONE_EVENT and not simulation.running:
+                simulatedTrajectories = {}
+                simulationFrames = {}
+            if event1 == '-PAUSE_SIMULATION_BUTTON-' and simulation.running:
+                if simulation.paused:
+                    simulation.resume()
+                    studio_window['-PAUSE_SIMULATION_BUTTON-'].update('Pause')
+                else:
+                    simulation.pause()
+                    studio_window['-PAUSE_SIMULATION_BUTTON-'].update('Resume')
+            if event1 == '-SIMULATION_SPEED-':
+                simulation.set_speed(float(values1['-SIMULATION_SPEED-'].rstrip('x')))
+            if event1 == '-SIMULATION_SEEK-' and len(simulatedTrajectories) > 0:
+                duration = max(t.duration for t in simulatedTrajectories.values())
+                simulation.seek(values1['-SIMULATION_SEEK-'] / 100 * duration)
 
             if event1 == '-EXPORT_BUTTON-':
-                if len(convertedPoints) > 0:
+                if len(path.points) > 0:
                     export_location = ''
                     while export_location == '':
                         export_location = sg.PopupGetFolder('Choose Export Location')
                     if export_location is not None:
-                        export_location = export_location + '/AutonPath.java'
-                        export_file = open(export_location, 'w')
-                        export_string = ''
-                        export_string += 'package org.firstinspires.ftc.teamcode;\n\n'
-                        export_string += 'import com.qualcomm.robotcore.eventloop.opmode.Autonomous;\n\n'
-                        export_string += '@Autonomous\n'
-                        export_string += 'public class AutonPath extends PositionBasedAuton3 {\n'
-                        export_string += 'public void setStartPos(){\n'
-                        export_string += f'startX = {convertedPoints[0][0]}; startY = {convertedPoints[0][1]};\n'
-                        export_string += f'startOrientation = {startHeading};\n'
-                        export_string += '}\n\n'
-                        export_string += 'public void drive(){\n'
-                        heading = startHeading
-                        for i in range(1, len(points)):
-                            for t in turns:
-                                if t[0] == i - 1:
-                                    export_string += f'turn({t[1]},TURN_SPEED,positioning);\n'
-                                    heading = t[1]
-                            export_string += f'driveToPosition({convertedPoints[i][0]},{convertedPoints[i][1]},DRIVE_SPEED,{heading},0,0,positioning,sensing);\n'
-                        export_string += '}}'
-                        export_file.write(export_string)
+                        with open(export_location + '/AutonPath.java', 'w') as export_file:
+                            je.write_opmode(export_file, af.Routine(path.points, path.turns, path.velocities,
+                                                                    path.start_heading, segments=path.segments,
+                                                                    handles=path.handles))
                         sg.Popup('Export Successful!')
                 else:
                     sg.Popup('No Paths to Export')
@@ -630,121 +762,111 @@ if __name__ == '__main__':
                     save_name = sg.PopupGetText('Name:')
                 if save_name is not None:
                     save_location = sg.PopupGetFolder('', no_window=True)
-                    save_location = save_location + '/' + save_name + '.auton'
-                    save_file = open(save_location, 'w')
-                    save_string = ''
-                    save_string += str(len(points)) + '\n'
-                    for p in points:
-                        save_string += f'{p[0]} {p[1]}\n'
-                    save_string += str(len(turns)) + '\n'
-                    for t in turns:
-                        save_string += f'{t[0]} {t[1]}\n'
-                    save_file.write(save_string)
-                    save_file.close()
+                    if save_location:
+                        robotSize = None
+                        if robotSize_X is not None and robotSize_Y is not None:
+                            robotSize = (co.CONFIG_CANVAS.length_to_inches(robotSize_X),
+                                         co.CONFIG_CANVAS.length_to_inches(robotSize_Y))
+                        af.save(save_location + '/' + save_name + '.auton',
+                                af.Routine(path.points, path.turns, path.velocities, path.start_heading, robotSize,
+                                           fieldConfiguration, path.segments, path.handles))
 
             if event1 == '-LOAD_BUTTON-':
                 choice = sg.PopupYesNo('Do you want to load a save?\nYou will lose any unsaved progress if you do so.')
                 if choice == 'Yes':
-                    points.clear()
-                    turns.clear()
-                    velocities.clear()
                     save_location = sg.PopupGetFile('Hello', no_window=True, file_types=(("Auton Files", "*.auton"),))
-                    save_file = open(save_location, 'r')
-                    num_points = int(save_file.readline())
-                    for i in range(num_points):
-                        line = save_file.readline().split()
-                        points.append([int(line[0]), int(line[1])])
-                        velocities.append(defaultVelocity)
-                    num_turns = int(save_file.readline())
-                    for i in range(num_turns):
-                        line = save_file.readline().split()
-                        turns.append([int(line[0]), int(line[1])])
-                    save_file.close()
-
-            # Add points and turns to list of paths and turns, then display them in the path and turn list
-            pathStrings = []
-            convertedPoints = hf.convert_coordinates_to_inches(points, pixels_per_inch=5, field_length_inches=144)
-            heading = startHeading
-            prevTurn = None
-            for i in range(1, len(points)):
-                for t in turns:
-                    if t[0] == i - 1:
-                        if prevTurn is None:
-                            heading = startHeading
+                    if save_location:
+                        try:
+                            routine = af.load(save_location)
+                        except (OSError, ValueError) as error:
+                            sg.Popup('Could not load save: ' + str(error))
                         else:
-                            heading = prevTurn[1]
-                    prevTurn = t
-                pathStrings.append(
-                    'Path #' + str(i) + ': ' + hf.generate_path_string(convertedPoints[i - 1], convertedPoints[i],
-                                                                       velocities[i - 1], heading))
-            studio_window['-PATH_LIST-'].update(values=pathStrings)
-            turnStrings = []
-            turns = hf.sort_turns(turns)
-            for i in range(0, len(turns)):
-                turnStrings.append('Turn #' + str(i + 1) + ": " + hf.generate_turn_string(turns[i], convertedPoints))
-            studio_window['-TURN_LIST-'].update(values=turnStrings)
-
-            # Draw turn indicators
-            for i in range(len(turnIndicator_circles)):
-                field.delete_figure(turnIndicator_circles[i])
-                field.delete_figure(turnIndicator_text[i])
-            for i in range(0, len(turns)):
-                if len(turnIndicator_circles) < i + 1:
-                    turnIndicator_circles.append(None)
-                    turnIndicator_text.append(None)
-                turnIndicator_circles[i] = field.draw_circle(points[turns[i][0]], 5, fill_color='black')
-                turnIndicator_text[i] = field.draw_text(text=str(turns[i][1]) + '°',
-                                                        location=[points[turns[i][0]][0] + 10,
-                                                                  points[turns[i][0]][1] + 10], color='dark blue')
-
-            # Draw robot on the field and ensures the robot cannot be magically clipping through
-            # the field walls (robot starts touching field wall if outside boundary)
-            if len(points) > 0:
-                field.delete_figure(robot_polygon)
-                field.delete_figure(robot_point)
-                robotCBr = [45, -45]  # Bottom right corner and go clockwise
-                robotCBl = [-45, -45]
-                robotCTl = [-45, 45]
-                robotCTr = [45, 45]
-                robotPolygonPoints = [robotCBr, robotCBl, robotCTl, robotCTr]
-                rot_deltas_final = [[[45], [-45]], [[-45], [-45]], [[-45], [45]], [[45], [45]]]
-                if abs(startHeading - 0.0) > 0:
-                    rot_deltas_final = hf.calculate_rotation_per_frame(points=robotPolygonPoints, angle1=0.0,
-                                                                       angle2=startHeading, degrees_per_second=45,
-                                                                       frames_per_second=60)
-                robotCBr = [points[0][0] + rot_deltas_final[0][0][-1],
-                            points[0][1] + rot_deltas_final[0][1][-1]]  # Bottom right corner and go clockwise
-                robotCBl = [points[0][0] + rot_deltas_final[1][0][-1], points[0][1] + rot_deltas_final[1][1][-1]]
-                robotCTl = [points[0][0] + rot_deltas_final[2][0][-1], points[0][1] + rot_deltas_final[2][1][-1]]
-                robotCTr = [points[0][0] + rot_deltas_final[3][0][-1], points[0][1] + rot_deltas_final[3][1][-1]]
-                robotPolygonPoints = [robotCBr, robotCBl, robotCTl, robotCTr]
-                robot_polygon = field.draw_polygon(robotPolygonPoints, line_color='black', line_width='3',
-                                                   fill_color='')
-                robotPoint = [((robotCTr[0] + robotCBr[0]) / 2.0), ((robotCTr[1] + robotCBr[1]) / 2.0)]
-                if startHeading == 0:
-                    robotPoint = [((robotCTr[0] + robotCTl[0]) / 2.0), ((robotCTr[1] + robotCTl[1]) / 2.0)]
-                robot_point = field.draw_point(point=robotPoint, color='yellow', size=15)
-
-                # Draw lines between all points
-                print(points)
-                if len(points) > 0:
-                    field.delete_figure(startPoint_circle)
-                    startPoint_circle = field.draw_circle(points[0], 5)
-                field.delete_figure(startPoint_line)
-                if len(points) > 1:
-                    lineColor = 'black'
-                    if selectedPathNum == 1:
-                        lineColor = 'yellow'
-                    startPoint_line = field.draw_line(points[0], points[1], color=lineColor, width=2.0)
-                for pl in point_lines:
-                    field.delete_figure(pl)
-                for i in range(2, len(points)):
-                    lineColor = 'black'
-                    if selectedPathNum == i:
-                        lineColor = 'yellow'
-                    if len(point_lines) < i - 1:
-                        point_lines.append(None)
-                    point_lines[i - 2] = (field.draw_line(points[i - 1], points[i], color=lineColor, width=2.0))
-
-    export_file.close()
+                            history.do('load', routine.points, routine.turns, routine.velocities, routine.start_heading,
+                                      routine.segments, routine.handles)
+                            selectedPathNum = None
+                            selectedTurnNum = None
+                            pathEditUpdated = False
+                            turnEditUpdated = False
+                            if routine.robot_size is not None:
+                                robotSize_X = co.CONFIG_CANVAS.length_to_pixels(routine.robot_size[0])
+                                robotSize_Y = co.CONFIG_CANVAS.length_to_pixels(routine.robot_size[1])
+                                robotCorners = traj.robot_corners(routine.robot_size[0], routine.robot_size[1])
+                            if routine.field_configuration is not None:
+                                fieldConfiguration = routine.field_configuration
+                                studio_window['-FIELD_CONFIG_TEXT-'].update('Field Configuration: ' +
+                                                                            fieldConfiguration)
+                            if drawnFieldConfiguration != fieldConfiguration:
+                                for figure in fieldFigures:
+                                    field.delete_figure(figure)
+                                fieldFigures = fb.draw_field(field, fieldConfiguration)
+                                drawnFieldConfiguration = fieldConfiguration
+
+            # Display the paths and turns in the path and turn list, only rebuilding the strings of the paths and
+            # turns that were edited and only pushing the lists to Tk when they changed
+            if shownPathVersion != path.path_version:
+                studio_window['-PATH_LIST-'].update(values=path.path_strings())
+                shownPathVersion = path.path_version
+            if shownTurnVersion != path.turn_version:
+                studio_window['-TURN_LIST-'].update(values=path.turn_strings())
+                shownTurnVersion = path.turn_version
+            # Time the robot takes to drive the routine, only recomputed after an edit or a drivetrain change
+            if shownRoutineTime != (path.path_version, path.turn_version, drivetrain):
+                studio_window['-ROUTINE_TIME-'].update(
+                    f'Routine Time: {path.routine_time(mp.DRIVETRAIN_LIMITS[drivetrain]):.2f} s')
+                shownRoutineTime = (path.path_version, path.turn_version, drivetrain)
+            # Check the robot's footprint along the whole routine against the walls and field elements
+            if checkedCollisions != (path.path_version, path.turn_version, drivetrain, robotCorners, fieldConfiguration):
+                routineTrajectory = traj.compile_routine(path, mp.DRIVETRAIN_LIMITS[drivetrain], robotCorners)
+                collidingPaths = set(cl.colliding_paths(routineTrajectory, cl.obstacles_for(fieldConfiguration)))
+                checkedCollisions = (path.path_version, path.turn_version, drivetrain, robotCorners, fieldConfiguration)
+            if simulationRequested:
+                simulatedTrajectories = {'main': routineTrajectory}
+                for partnerName, (_, _, partnerDrivetrain) in partners.items():
+                    simulatedTrajectories[partnerName] = partnerTrajectories[(partnerName, partnerDrivetrain)]
+                simulationFrames = {}
+                simulation.start(simulatedTrajectories, speed=float(values1['-SIMULATION_SPEED-'].rstrip('x')))
+                studio_window['-PAUSE_SIMULATION_BUTTON-'].update('Pause')
+                simulationRequested = False
+            # Check our robot and the partners' robots against each other, all starting on the same clock
+            conflictKey = (checkedCollisions, tuple((k, d) for k, (_, _, d) in partners.items()))
+            if checkedConflicts != conflictKey:
+                conflictTrajectories = {'main': routineTrajectory}
+                for partnerName, (_, _, partnerDrivetrain) in partners.items():
+                    conflictTrajectories[partnerName] = partnerTrajectories[(partnerName, partnerDrivetrain)]
+                robotConflicts = cl.robot_conflicts(conflictTrajectories)
+                conflictText = 'None'
+                if len(robotConflicts) > 0:
+                    conflictText = ', '.join(f'{a} / {b} at {start:.1f}-{end:.1f} s'
+                                             for a, b, start, end in robotConflicts[:3])
+                    if len(robotConflicts) > 3:
+                        conflictText += f' and {len(robotConflicts) - 3} more'
+                studio_window['-ROBOT_CONFLICTS-'].update('Robot Conflicts: ' + conflictText)
+                checkedConflicts = conflictKey
+
+            # Draw the robot on the start point, or the robots being simulated at their current frame
+            robots = {robot: (simulatedTrajectories[robot].corners(j), simulatedTrajectories[robot].front_point(j))
+                      for robot, j in simulationFrames.items()}
+            if len(path.points) > 0 and 'main' not in simulationFrames:
+                startPoint = path.points[0]
+                robots['main'] = (traj.pose_corners(startPoint[0], startPoint[1], path.start_heading, robotCorners),
+                                  traj.pose_front_point(startPoint[0], startPoint[1], path.start_heading,
+                                                        robotCorners))
+            for partnerName, (partnerPath, partnerCorners, _) in partners.items():
+                if len(partnerPath.points) > 0 and partnerName not in simulationFrames:
+                    startPoint = partnerPath.points[0]
+                    robots[partnerName] = (traj.pose_corners(startPoint[0], startPoint[1], partnerPath.start_heading,
+                                                             partnerCorners),
+                                           traj.pose_front_point(startPoint[0], startPoint[1],
+                                                                 partnerPath.start_heading, partnerCorners))
+            # The highlight under the mouse only lasts until something other than a mouse move happens
+            scene.remove('hover')
+            fr.draw_routine(scene, path, robots, selectedPathNum, collidingPaths,
+                            {k: p for k, (p, _, _) in partners.items()})
+            telemetry.end()
+
+    if studio_window is not None:
+        studio_window.close()
     title_window.close()
+    if telemetry is not None:
+        telemetry.dump()
+    profiler.stop()
@@ -0,0 +1,244 @@
+# Python Module Benchmark
+# Times the helpers and the studio's per-event work on synthetic routines of 10 to 5000 points with few or many
+# turns, without a window: the field is drawn on StubGraph, which only counts the figures it is asked to draw,
+# move, recolor or delete, and the cases drawing the field report those counts for one call. Results can be
+# saved as a baseline and later runs compared against it, a case that got slower than its baseline by more than
+# the tolerance fails the run.
+#
+#   python Benchmark.py --save-baseline     measure and store the baseline
+#   python Benchmark.py                     measure and compare against the stored baseline
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import Coordinates as co
+import Curves as cu
+import FieldRenderer as fr
+import HelperFunctions as hf
+import MotionProfile as mp
+import PathModel as pm
+import Trajectory as traj
+
+POINT_COUNTS = (10, 100, 1000, 5000)
+# Fraction of the points holding a turn
+TURN_DENSITIES = (0.1, 0.5)
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_TOLERANCE = 0.25
+# Every case is run for at least this long per round, the fastest round counts
+ROUND_SECONDS = 0.05
+
+
+class _StubCanvas:
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def coords(self, figure, *coords):
+        self.graph.calls['coords'] += 1
+
+    def itemconfig(self, figure, **options):
+        self.graph.calls['itemconfig'] += 1
+
+
+class StubGraph:
+    # Stands in for a PySimpleGUI Graph of the field, counting draw and delete calls instead of talking to Tk
+
+    def __init__(self, size=720):
+        self.size = size
+        self.calls = {'draw': 0, 'delete': 0, 'coords': 0, 'itemconfig': 0}
+        self.TKCanvas = _StubCanvas(self)
+        self._next_figure = 0
+
+    def _draw(self, *args, **kwargs):
+        self.calls['draw'] += 1
+        self._next_figure += 1
+        return self._next_figure
+
+    draw_line = draw_lines = draw_circle = draw_point = draw_polygon = draw_text = _draw
+
+    def delete_figure(self, figure):
+        self.calls['delete'] += 1
+
+    def _convert_xy_to_canvas_xy(self, x, y):
+        return int(x), int(self.size - y)
+
+
+def synthetic_routine(point_count, turn_density, seed=0):
+    # Random walk of points across the field with turns on a fraction of them and a few curved paths
+    generator = random.Random(seed)
+    path = pm.PathModel()
+    x, y = 360.0, 360.0
+    for i in range(point_count):
+        if i == 0:
+            path.set_start_point(x, y)
+        else:
+            x = min(max(x + generator.uniform(-60, 60), 50), 670)
+            y = min(max(y + generator.uniform(-60, 60), 50), 670)
+            path.add_point(x, y)
+    for i in generator.sample(range(point_count), int(point_count * turn_density)):
+        path.add_turn(i, float(generator.randrange(-180, 180, 15)))
+    for s in range(1, point_count, 10):
+        path.set_segment_type(s, cu.CATMULL_ROM)
+    return path
+
+
+def _cases(point_count, turn_density):
+    # (name, setup) pairs, setup returns the function to time and the StubGraph it draws on (None if it does not)
+    def converting():
+        points = synthetic_routine(point_count, turn_density).points.tolist()
+        return (lambda: hf.convert_coordinates_to_inches(points, co.FIELD.pixels_per_inch,
+                                                         co.FIELD.field_length_inches)), None
+
+    def sorting():
+        turns = list(synthetic_routine(point_count, turn_density).turns)
+        random.Random(1).shuffle(turns)
+        return (lambda: hf.sort_turns(turns)), None
+
+    def rotating():
+        angles = [t[1] for t in synthetic_routine(point_count, turn_density).turns]
+        return (lambda: [hf.calculate_rotation_per_frame(traj.ROBOT_CORNERS, 0, a, 45, 60) for a in angles]), None
+
+    def moving():
+        points = synthetic_routine(point_count, turn_density).points.tolist()
+        return (lambda: [hf.calculate_movement_per_frame(p1, p2, 48, 60, co.FIELD.pixels_per_inch)
+                         for p1, p2 in zip(points, points[1:])]), None
+
+    def path_strings_after_move():
+        path = synthetic_routine(point_count, turn_density)
+        # Every string is built once, so only the ones the move clears are timed
+        path.path_strings()
+        middle = point_count // 2
+        x, y = path.points[middle]
+
+        def edit():
+            path.move_point(middle, x + 1, y)
+            path.path_strings()
+            path.move_point(middle, x, y)
+            path.path_strings()
+        return edit, None
+
+    def path_strings_full():
+        path = synthetic_routine(point_count, turn_density)
+
+        def rebuild():
+            path.set_points(path.points)
+            path.path_strings()
+        return rebuild, None
+
+    def redraw_full():
+        path = synthetic_routine(point_count, turn_density)
+        graph = StubGraph()
+        return (lambda: fr.draw_routine(fr.FieldScene(graph), path, _robots(path))), graph
+
+    def redraw_after_move():
+        path = synthetic_routine(point_count, turn_density)
+        graph = StubGraph()
+        scene = fr.FieldScene(graph)
+        fr.draw_routine(scene, path, _robots(path))
+        middle = point_count // 2
+        x, y = path.points[middle]
+
+        def edit():
+            path.move_point(middle, x + 1, y)
+            fr.draw_routine(scene, path, _robots(path), selected_path=middle)
+            path.move_point(middle, x, y)
+            fr.draw_routine(scene, path, _robots(path), selected_path=middle)
+        return edit, graph
+
+    def compiling():
+        path = synthetic_routine(point_count, turn_density)
+        limits = mp.DRIVETRAIN_LIMITS['Mechanum with Odometry']
+        return (lambda: traj.compile_trajectory(path.points, path.turns, path.velocities, path.start_heading,
+                                                paths=path.sampled_paths(), limits=limits)), None
+
+    return [('convert_coordinates_to_inches', converting), ('sort_turns', sorting),
+            ('calculate_rotation_per_frame', rotating), ('calculate_movement_per_frame', moving),
+            ('path strings after a move', path_strings_after_move), ('path strings rebuilt', path_strings_full),
+            ('field drawn from scratch', redraw_full), ('field redrawn after a move', redraw_after_move),
+            ('trajectory compiled', compiling)]
+
+
+def _robots(path):
+    start = path.points[0]
+    return {'main': (traj.pose_corners(start[0], start[1], path.start_heading),
+                     traj.pose_front_point(start[0], start[1], path.start_heading))}
+
+
+def _time(function, rounds):
+    # Seconds per call of the fastest round, every round calls the function often enough to last ROUND_SECONDS
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= ROUND_SECONDS:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def run(point_counts=POINT_COUNTS, turn_densities=TURN_DENSITIES, rounds=5, selected=None, output=print):
+    # Milliseconds per call of every case, keyed by case name, point count and turn density
+    results = {}
+    for point_count in point_counts:
+        for turn_density in turn_densities:
+            for name, setup in _cases(point_count, turn_density):
+                if selected is not None and selected not in name:
+                    continue
+                key = f'{name} [{point_count} points, {turn_density:g} turns]'
+                function, graph = setup()
+                results[key] = _time(function, rounds) * 1000
+                line = f'{key:<70}{results[key]:>12.3f} ms'
+                if graph is not None:
+                    # Canvas calls of one more call, the timed ones left the counts in the graph
+                    graph.calls = dict.fromkeys(graph.calls, 0)
+                    function()
+                    line += '  ' + ' '.join(f'{call} {count}' for call, count in graph.calls.items())
+                output(line)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # Cases that got slower than their baseline by more than the tolerance, as (case, baseline ms, now ms)
+    return [(key, baseline[key], ms) for key, ms in results.items()
+            if key in baseline and ms > baseline[key] * (1 + tolerance)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the helpers and the field redraw on synthetic routines.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='file the baseline is read from and saved to')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='how much slower than the baseline a case may get, as a fraction (default: 0.25)')
+    parser.add_argument('--points', type=int, nargs='+', default=list(POINT_COUNTS), help='routine sizes to run')
+    parser.add_argument('--rounds', type=int, default=5, help='rounds per case, the fastest counts')
+    parser.add_argument('-k', dest='selected', default=None, help='only run the cases whose name contains this')
+    args = parser.parse_args(argv)
+    results = run(args.points, rounds=args.rounds, selected=args.selected)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --save-baseline to store one')
+        return 0
+    with open(args.baseline) as baseline_file:
+        regressions = compare(results, json.load(baseline_file), args.tolerance)
+    for key, before, after in regressions:
+        print(f'REGRESSION {key}: {before:.3f} ms -> {after:.3f} ms', file=sys.stderr)
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
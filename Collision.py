@@ -0,0 +1,135 @@
+# Python Module Collision
+# Checks the robot's footprint at every frame of a trajectory against the static obstacles of a field
+# configuration: the field walls and, on the Skystone field, the skybridge. The broad phase compares the
+# bounding boxes of all footprints with those of all obstacles in one array operation, only the overlapping
+# pairs go through the separating axis test, which is vectorized over the pairs as well. Footprints and
+# obstacles are convex quadrilaterals in field pixels.
+import functools
+import itertools
+import math
+
+import numpy as np
+
+import Coordinates as co
+import FieldBackground as fb
+
+# Walls are modeled as thick blocks around the field, so a robot can not skip past one between two frames
+WALL_THICKNESS = 100
+# Frames per time window of the robot against robot check, see robot_overlaps
+OVERLAP_WINDOW = 16
+
+
+def _rectangle(point_from, point_to):
+    (x1, y1), (x2, y2) = point_from, point_to
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+
+
+def _walls(field_length_pixels):
+    length, thickness = field_length_pixels, WALL_THICKNESS
+    return [_rectangle([-thickness, -thickness], [0, length + thickness]),
+            _rectangle([length, -thickness], [length + thickness, length + thickness]),
+            _rectangle([0, -thickness], [length, 0]),
+            _rectangle([0, length], [length, length + thickness])]
+
+
+# Field elements the robot can not drive through, the stones and foundations are pushed around so they are left out
+FIELD_OBSTACLES = {
+    'None': [],
+    'FTC Skystone': [_rectangle(fb.SKYBRIDGE[1], fb.SKYBRIDGE[2])],
+    'FTC Rover Ruckus': [],
+}
+
+
+class ObstacleSet:
+
+    def __init__(self, polygons):
+        # Obstacles x 4 x 2 corners and their bounding boxes as min x, min y, max x, max y
+        self.polygons = np.asarray(polygons, dtype=float).reshape(-1, 4, 2)
+        self.boxes = np.concatenate((self.polygons.min(axis=1), self.polygons.max(axis=1)), axis=1)
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def colliding_frames(self, footprints):
+        # Whether each footprint (frames x 4 x 2) overlaps any obstacle, touching does not count
+        footprints = np.asarray(footprints, dtype=float)
+        colliding = np.zeros(len(footprints), dtype=bool)
+        if len(footprints) == 0 or len(self) == 0:
+            return colliding
+        boxes = np.concatenate((footprints.min(axis=1), footprints.max(axis=1)), axis=1)
+        overlapping = ((boxes[:, None, 0] < self.boxes[None, :, 2]) & (self.boxes[None, :, 0] < boxes[:, None, 2]) &
+                       (boxes[:, None, 1] < self.boxes[None, :, 3]) & (self.boxes[None, :, 1] < boxes[:, None, 3]))
+        frames, obstacles = np.nonzero(overlapping)
+        hits = ~_separated(footprints[frames], self.polygons[obstacles])
+        colliding[frames[hits]] = True
+        return colliding
+
+
+def _separated(a, b):
+    # Separating axis test of pairs of convex polygons (pairs x corners x 2), True where a pair does not overlap
+    def normals(polygons):
+        edges = np.roll(polygons, -1, axis=1) - polygons
+        return np.stack((-edges[..., 1], edges[..., 0]), axis=-1)
+    axes = np.concatenate((normals(a), normals(b)), axis=1)
+    projected_a = np.einsum('kvd,kad->kav', a, axes)
+    projected_b = np.einsum('kvd,kad->kav', b, axes)
+    gaps = ((projected_a.max(axis=2) <= projected_b.min(axis=2)) |
+            (projected_b.max(axis=2) <= projected_a.min(axis=2)))
+    return gaps.any(axis=1)
+
+
+@functools.lru_cache(maxsize=None)
+def obstacles_for(configuration, field_length_pixels=co.FIELD.field_length_pixels):
+    return ObstacleSet(_walls(field_length_pixels) + FIELD_OBSTACLES.get(configuration, []))
+
+
+def colliding_paths(trajectory, obstacles):
+    # Numbers (from 1) of the paths during which the robot hits an obstacle
+    colliding = obstacles.colliding_frames(trajectory.footprints())
+    return sorted(set(trajectory.path_of_frames()[colliding].tolist()))
+
+
+def _hold_last(footprints, frame_count):
+    # Footprints padded to frame_count frames with the last one, a robot that finished stays where it stopped
+    return np.concatenate((footprints, np.repeat(footprints[-1:], frame_count - len(footprints), axis=0)))
+
+
+def robot_overlaps(trajectories, window=OVERLAP_WINDOW):
+    # Frames at which two robots overlap as {(robot, robot): frame indices} for the pairs that do, trajectories
+    # (keyed by robot) all start at frame 0 of one clock. The frames are cut into windows and each robot's
+    # footprints over a window are boxed together, only windows in which two of those swept boxes overlap are
+    # checked frame by frame, so robots that stay apart cost one box test per window
+    trajectories = {k: t for k, t in trajectories.items() if len(t) > 0}
+    if len(trajectories) < 2:
+        return {}
+    frame_count = max(len(t) for t in trajectories.values())
+    window_count = int(math.ceil(frame_count / window))
+    footprints = {k: _hold_last(t.footprints(), frame_count) for k, t in trajectories.items()}
+    swept = {}
+    for robot, f in footprints.items():
+        windows = _hold_last(f, window_count * window).reshape(window_count, -1, 2)
+        swept[robot] = np.concatenate((windows.min(axis=1), windows.max(axis=1)), axis=1)
+    overlaps = {}
+    for a, b in itertools.combinations(trajectories, 2):
+        box_a, box_b = swept[a], swept[b]
+        windows = np.nonzero((box_a[:, 0] < box_b[:, 2]) & (box_b[:, 0] < box_a[:, 2]) &
+                             (box_a[:, 1] < box_b[:, 3]) & (box_b[:, 1] < box_a[:, 3]))[0]
+        frames = (windows[:, None] * window + np.arange(window)).ravel()
+        frames = frames[frames < frame_count]
+        hits = frames[~_separated(footprints[a][frames], footprints[b][frames])]
+        if len(hits) > 0:
+            overlaps[(a, b)] = hits
+    return overlaps
+
+
+def robot_conflicts(trajectories, window=OVERLAP_WINDOW):
+    # Times at which two robots run into each other as sorted (robot, robot, start seconds, end seconds)
+    conflicts = []
+    for (a, b), frames in robot_overlaps(trajectories, window).items():
+        frames_per_second = trajectories[a].frames_per_second
+        breaks = np.nonzero(np.diff(frames) > 1)[0]
+        starts = np.concatenate(([frames[0]], frames[breaks + 1]))
+        ends = np.concatenate((frames[breaks], [frames[-1]]))
+        conflicts += [(a, b, float(start / frames_per_second), float(end / frames_per_second))
+                      for start, end in zip(starts, ends)]
+    return sorted(conflicts, key=lambda c: (c[2], str(c[0]), str(c[1])))
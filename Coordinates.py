@@ -0,0 +1,71 @@
+# Python Module Coordinates
+# The affine transform between field pixels (origin bottom left of the graph) and inches (origin in the center
+# of the field, the coordinates shown in the studio and exported to Java). Transforms take an array of points
+# of any length and run as one NumPy expression, so converting a long path costs about as much as one point.
+# Also snaps points to the inch, half inch or tile and mirrors them to the other alliance. FIELD is the studio's
+# field graph and CONFIG_CANVAS the robot drawing of the configuration menu, every module scales by one of them.
+import numpy as np
+
+TILE_INCHES = 24
+
+# Snap mode: (step in inches, offset of the first step from the center of the field in inches)
+SNAP_MODES = {
+    '1 in': (1, 0),
+    '0.5 in': (0.5, 0),
+    'Tile': (TILE_INCHES, TILE_INCHES / 2),  # Center of the tile
+}
+
+
+class FieldCoordinates:
+
+    def __init__(self, pixels_per_inch=5, field_length_inches=144):
+        self.pixels_per_inch = pixels_per_inch
+        self.field_length_inches = field_length_inches
+
+    @property
+    def field_length_pixels(self):
+        return self.field_length_inches * self.pixels_per_inch
+
+    def axis_to_inches(self, pixels):
+        # One coordinate, the field is square so x and y are transformed the same way
+        return pixels / self.pixels_per_inch - self.field_length_inches / 2.0
+
+    def axis_to_pixels(self, inches):
+        return (inches + self.field_length_inches / 2.0) * self.pixels_per_inch
+
+    def to_inches(self, points, decimals=2):
+        # (n, 2) points in field pixels to inches, rounded to the given number of decimals unless it is None
+        inches = self.axis_to_inches(np.asarray(points, dtype=float))
+        return inches if decimals is None else np.round(inches, decimals)
+
+    def to_pixels(self, points):
+        return self.axis_to_pixels(np.asarray(points, dtype=float))
+
+    def snap(self, points, mode='1 in'):
+        # (n, 2) points in field pixels moved to the closest step of the snap mode
+        step, offset = SNAP_MODES[mode]
+        inches = self.to_inches(points, decimals=None)
+        return self.to_pixels(np.round((inches - offset) / step) * step + offset)
+
+    def mirror(self, points):
+        # The alliances' halves of the field are mirror images across its vertical center line
+        mirrored = np.array(points, dtype=float)
+        mirrored[:, 0] = self.field_length_pixels - mirrored[:, 0]
+        return mirrored
+
+    @staticmethod
+    def mirror_heading(heading):
+        return 0.0 - heading  # Not -heading, which would turn 0 into -0.0
+
+    def length_to_pixels(self, inches):
+        # A length, unlike a coordinate, has no offset
+        return inches * self.pixels_per_inch
+
+    def length_to_inches(self, pixels):
+        return pixels / self.pixels_per_inch
+
+
+# Five pixels per inch, the 144 inch field is a 720 by 720 pixel graph
+FIELD = FieldCoordinates(pixels_per_inch=5, field_length_inches=144)
+# 18 pixels per inch on the 350 by 350 pixel canvas of the configuration menu
+CONFIG_CANVAS = FieldCoordinates(pixels_per_inch=18, field_length_inches=350 / 18)
@@ -0,0 +1,113 @@
+# Python Module Curves
+# Segment types of a path and sampling them into polylines. A straight path is its two end points, a curved
+# one is sampled adaptively: intervals of the curve parameter are split in half until the curve is within
+# TOLERANCE pixels of the polyline, so tight bends get many samples and gentle ones only a few. Every sampled
+# path keeps the cumulative arc length at each sample, which the simulator uses to drive the curve at a
+# constant speed.
+#   Catmull-Rom      cubic through the end points, shaped by the points before and after the path
+#   Bezier           cubic with two handles stored with the path
+#   Quintic Hermite  like Catmull-Rom but also matching the change of direction at the end points, so
+#                    consecutive curved paths join without a jump in curvature
+import numpy as np
+
+LINE = 0
+CATMULL_ROM = 1
+BEZIER = 2
+QUINTIC_HERMITE = 3
+
+SEGMENT_TYPES = {'Line': LINE, 'Catmull-Rom': CATMULL_ROM, 'Bezier': BEZIER, 'Quintic Hermite': QUINTIC_HERMITE}
+SEGMENT_NAMES = {kind: name for name, kind in SEGMENT_TYPES.items()}
+
+# Segment types shaped by the points next to the path, moving any of those has to resample the path
+USES_NEIGHBORS = (CATMULL_ROM, QUINTIC_HERMITE)
+
+# Largest distance in pixels between a curve and its sampled polyline
+TOLERANCE = 0.5
+MAX_DEPTH = 12
+
+
+class Samples:
+
+    __slots__ = ('points', 'lengths')
+
+    def __init__(self, points):
+        # k x 2 polyline and the arc length from the start of the path to every sample
+        self.points = points
+        steps = np.hypot(*np.diff(points, axis=0).T)
+        self.lengths = np.concatenate(([0.0], np.cumsum(steps)))
+
+    @property
+    def length(self):
+        return float(self.lengths[-1])
+
+
+def neighbors(points, s):
+    # Points before, at the start, at the end and after path s, the end points stand in for missing neighbors
+    p1 = np.asarray(points[s - 1], dtype=float)
+    p2 = np.asarray(points[s], dtype=float)
+    p0 = np.asarray(points[s - 2], dtype=float) if s >= 2 else p1
+    p3 = np.asarray(points[s + 1], dtype=float) if s + 1 < len(points) else p2
+    return p0, p1, p2, p3
+
+
+def default_handles(points, s):
+    # Bezier handles giving the same tangents as a Catmull-Rom curve, as x1, y1, x2, y2
+    p0, p1, p2, p3 = neighbors(points, s)
+    return np.concatenate((p1 + (p2 - p0) / 6, p2 - (p3 - p1) / 6))
+
+
+def _curve(kind, p0, p1, p2, p3, handles):
+    if kind == CATMULL_ROM:
+        a, b, c = -p0 + p2, 2 * p0 - 5 * p1 + 4 * p2 - p3, -p0 + 3 * p1 - 3 * p2 + p3
+        return lambda t: p1 + 0.5 * (a * t[:, None] + b * t[:, None] ** 2 + c * t[:, None] ** 3)
+    if kind == BEZIER:
+        h1 = np.asarray(handles[0:2], dtype=float)
+        h2 = np.asarray(handles[2:4], dtype=float)
+
+        def bezier(t):
+            t = t[:, None]
+            u = 1 - t
+            return u ** 3 * p1 + 3 * u ** 2 * t * h1 + 3 * u * t ** 2 * h2 + t ** 3 * p2
+        return bezier
+    if kind == QUINTIC_HERMITE:
+        v1, v2 = (p2 - p0) / 2, (p3 - p1) / 2
+        a1, a2 = p0 - 2 * p1 + p2, p1 - 2 * p2 + p3
+
+        def hermite(t):
+            t = t[:, None]
+            t3, t4, t5 = t ** 3, t ** 4, t ** 5
+            return ((1 - 10 * t3 + 15 * t4 - 6 * t5) * p1 + (t - 6 * t3 + 8 * t4 - 3 * t5) * v1 +
+                    (0.5 * t ** 2 - 1.5 * t3 + 1.5 * t4 - 0.5 * t5) * a1 + (0.5 * t3 - t4 + 0.5 * t5) * a2 +
+                    (-4 * t3 + 7 * t4 - 3 * t5) * v2 + (10 * t3 - 15 * t4 + 6 * t5) * p2)
+        return hermite
+    raise ValueError(f'Unknown segment type {kind}')
+
+
+def sample(kind, points, s, handles=None, tolerance=TOLERANCE):
+    # Sampled polyline of path s (from points[s - 1] to points[s]) with the given segment type
+    p0, p1, p2, p3 = neighbors(points, s)
+    if kind == LINE:
+        return Samples(np.array([p1, p2]))
+    curve = _curve(kind, p0, p1, p2, p3, handles)
+    t = np.linspace(0.0, 1.0, 5)
+    for _ in range(MAX_DEPTH):
+        positions = curve(t)
+        middle_t = (t[:-1] + t[1:]) / 2
+        error = np.hypot(*(curve(middle_t) - (positions[:-1] + positions[1:]) / 2).T)
+        split = error > tolerance
+        if not split.any():
+            break
+        t = np.sort(np.concatenate((t, middle_t[split])))
+    positions = curve(t)
+    # Land exactly on the end points so consecutive paths meet
+    positions[0], positions[-1] = p1, p2
+    return Samples(positions)
+
+
+def sample_path(points, segments=None, handles=None, tolerance=TOLERANCE):
+    # Samples of every path of a routine, all straight when it has no segment types
+    result = []
+    for s in range(1, len(points)):
+        kind = LINE if segments is None else int(segments[s - 1])
+        result.append(sample(kind, points, s, None if handles is None else handles[s - 1], tolerance))
+    return result
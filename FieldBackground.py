@@ -0,0 +1,121 @@
+# Python Module FieldBackground
+# The static part of the field (tile grid and game elements) for every field configuration. It is rasterized
+# once into a PNG and drawn as a single image, so the canvas only holds the path figures on top of it. Images
+# are cached on disk under a name holding a hash of everything that goes into them, so changing a layout or
+# the canvas size renders a new image instead of reusing a stale one. Without Pillow the layout is drawn as
+# separate canvas figures like before.
+import hashlib
+import os
+
+try:
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = None
+
+CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.autonstudio', 'field_cache')
+BACKGROUND_COLOR = '#BAB8B8'
+
+# Field layouts in graph coordinates (origin bottom left, 720 x 720 pixels for the 144 inch field)
+# ('line', point from, point to, color, width) and ('rectangle', top left, bottom right, fill color, line width)
+GRID_LAYOUT = ([('line', [24 * z, 720], [24 * z, 0], 'light grey', 1) for z in range(1, 31)] +
+               [('line', [0, 24 * z], [720, 24 * z], 'light grey', 1) for z in range(1, 31)] +
+               [('line', [120 * x, 720], [120 * x, 0], 'black', 1) for x in range(1, 6)] +
+               [('line', [0, 120 * x], [720, 120 * x], 'black', 1) for x in range(1, 6)])
+
+SKYBRIDGE = ('rectangle', [240, 400], [480, 320], '#28292B', 1)
+
+SKYSTONE_LAYOUT = [
+    ('line', [0, 120], [120, 120], 'red', 6),
+    ('line', [120, 0], [120, 120], 'red', 6),
+    ('line', [0, 600], [120, 720], 'blue', 6),
+    ('line', [600, 720], [720, 600], 'red', 6),
+    ('line', [0, 360], [240, 360], 'blue', 6),
+    ('line', [480, 360], [720, 360], 'red', 6),
+    ('line', [240, 365], [480, 365], 'yellow', 6),
+    ('line', [600, 120], [720, 120], 'blue', 6),
+    ('line', [600, 0], [600, 120], 'blue', 6),
+    SKYBRIDGE,
+    ('line', [240, 365], [480, 365], 'yellow', 3),
+    ('line', [240, 355], [480, 355], 'yellow', 3),
+    ('rectangle', [240, 690], [332.5, 517.5], 'blue', 1),  # Foundations
+    ('rectangle', [387.5, 690], [480, 517.5], 'red', 1),
+    ('rectangle', [241, 240], [261, 0], 'yellow', 0),  # Stones
+] + [('line', [241, y * 40], [261, y * 40], 'black', 0.5) for y in range(0, 7)]
+
+FIELD_LAYOUTS = {
+    'None': GRID_LAYOUT,
+    'FTC Skystone': GRID_LAYOUT + SKYSTONE_LAYOUT,
+    'FTC Rover Ruckus': GRID_LAYOUT,
+}
+
+# Bump when the way layouts are rasterized changes, so old cached images are not reused
+RENDER_VERSION = 1
+
+
+def _pil_color(color):
+    # Tk accepts 'light grey', Pillow only knows 'lightgrey'
+    return color.replace(' ', '')
+
+
+def cache_path(configuration, canvas_size):
+    layout = FIELD_LAYOUTS[configuration]
+    content = repr((RENDER_VERSION, BACKGROUND_COLOR, list(canvas_size), layout)).encode('utf-8')
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    name = ''.join(c if c.isalnum() else '_' for c in configuration)
+    return os.path.join(CACHE_DIRECTORY, f'{name}-{canvas_size[0]}x{canvas_size[1]}-{digest}.png')
+
+
+def render(configuration, canvas_size, graph_size=(720, 720)):
+    # Rasterize the layout of a field configuration, returning the path of the cached PNG
+    image_path = cache_path(configuration, canvas_size)
+    if os.path.exists(image_path):
+        return image_path
+    scale_x = canvas_size[0] / graph_size[0]
+    scale_y = canvas_size[1] / graph_size[1]
+
+    def convert(p):
+        return p[0] * scale_x, canvas_size[1] - p[1] * scale_y
+
+    image = Image.new('RGB', tuple(canvas_size), BACKGROUND_COLOR)
+    draw = ImageDraw.Draw(image)
+    for element in FIELD_LAYOUTS[configuration]:
+        if element[0] == 'line':
+            draw.line([convert(element[1]), convert(element[2])], fill=_pil_color(element[3]),
+                      width=max(int(round(element[4] * scale_x)), 1))
+        elif element[0] == 'rectangle':
+            (x1, y1), (x2, y2) = convert(element[1]), convert(element[2])
+            draw.rectangle([min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)], fill=_pil_color(element[3]),
+                           outline='black' if element[4] > 0 else None, width=int(element[4]))
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    # Write to a temporary file first so a half written image is never picked up from the cache
+    temporary_path = image_path + '.tmp'
+    image.save(temporary_path, 'PNG')
+    os.replace(temporary_path, image_path)
+    return image_path
+
+
+def draw_field(graph, configuration):
+    # Draw the static field below everything already on the graph, returning the figures that make it up
+    if Image is not None:
+        try:
+            image_path = render(configuration, graph.CanvasSize, (graph.TopRight[0] - graph.BottomLeft[0],
+                                                                   graph.TopRight[1] - graph.BottomLeft[1]))
+            figures = [graph.draw_image(filename=image_path, location=(graph.BottomLeft[0], graph.TopRight[1]))]
+        except OSError:
+            figures = _draw_figures(graph, configuration)
+    else:
+        figures = _draw_figures(graph, configuration)
+    for figure in reversed(figures):
+        graph.send_figure_to_back(figure)
+    return figures
+
+
+def _draw_figures(graph, configuration):
+    figures = []
+    for element in FIELD_LAYOUTS[configuration]:
+        if element[0] == 'line':
+            figures.append(graph.draw_line(element[1], element[2], color=element[3], width=element[4]))
+        elif element[0] == 'rectangle':
+            figures.append(graph.draw_rectangle(element[1], element[2], fill_color=element[3],
+                                                line_width=element[4] if element[4] != 1 else None))
+    return figures
@@ -0,0 +1,218 @@
+# Python Module FieldRenderer
+# Retained-mode drawing on top of a PySimpleGUI Graph. Every figure is kept under a key (for example
+# ('path', 3) or 'robot') along with the geometry and style it was drawn with. Redrawing a key with the
+# same values costs nothing, a new style only recolors the existing canvas item and new geometry only
+# moves it. draw_routine only redraws the paths and turns the PathModel stamped as changed since the scene last
+# drew it, so an event that changed one path only touches the figures of that path however long the routine is.
+
+
+def _line_coords(graph, geometry):
+    coords = []
+    for p in geometry:
+        coords.extend(graph._convert_xy_to_canvas_xy(p[0], p[1]))
+    return coords
+
+
+def _circle_coords(graph, geometry):
+    center, radius = geometry
+    converted_point = graph._convert_xy_to_canvas_xy(center[0], center[1])
+    radius = int(graph._convert_xy_to_canvas_xy(center[0] + radius, center[1])[0] - converted_point[0])
+    return [int(converted_point[0]) - radius, int(converted_point[1]) - radius,
+            int(converted_point[0]) + radius, int(converted_point[1]) + radius]
+
+
+def _point_coords(graph, geometry):
+    point, size = geometry
+    converted_point = graph._convert_xy_to_canvas_xy(point[0], point[1])
+    size = graph._convert_xy_to_canvas_xy(point[0] + size, point[1])[0] - converted_point[0]
+    return [converted_point[0] - size // 2, converted_point[1] - size // 2,
+            converted_point[0] + size // 2, converted_point[1] + size // 2]
+
+
+def _text_coords(graph, geometry):
+    return list(graph._convert_xy_to_canvas_xy(geometry[0], geometry[1]))
+
+
+# kind: (create the figure, canvas coordinates of the geometry, canvas options of the style)
+_FIGURE_KINDS = {
+    'line': (lambda graph, geometry, style: graph.draw_line(geometry[0], geometry[1], color=style[0], width=style[1]),
+             _line_coords,
+             lambda style: {'fill': style[0], 'width': style[1]}),
+    'lines': (lambda graph, geometry, style: graph.draw_lines(geometry, color=style[0], width=style[1]),
+              _line_coords,
+              lambda style: {'fill': style[0], 'width': style[1]}),
+    'circle': (lambda graph, geometry, style: graph.draw_circle(geometry[0], geometry[1], fill_color=style[0],
+                                                                line_color=style[1]),
+               _circle_coords,
+               lambda style: {'fill': style[0], 'outline': style[1]}),
+    'point': (lambda graph, geometry, style: graph.draw_point(geometry[0], size=geometry[1], color=style[0]),
+              _point_coords,
+              lambda style: {'fill': style[0], 'outline': style[0]}),
+    'polygon': (lambda graph, geometry, style: graph.draw_polygon(geometry, line_color=style[0], line_width=style[1],
+                                                                  fill_color=style[2]),
+                _line_coords,
+                lambda style: {'outline': style[0], 'width': style[1], 'fill': style[2]}),
+    'text': (lambda graph, geometry, style: graph.draw_text(text=style[0], location=geometry, color=style[1]),
+             _text_coords,
+             lambda style: {'text': style[0], 'fill': style[1]}),
+}
+
+
+def _as_tuple(point):
+    return float(point[0]), float(point[1])
+
+
+class FieldScene:
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._figures = {}
+        self._shapes = {}
+        # What draw_routine drew last, None when the scene has to be drawn from scratch
+        self.drawn_routine = None
+        # Running totals of canvas calls: figures created, figures deleted and figures moved or recolored
+        self.created = 0
+        self.deleted = 0
+        self.updated = 0
+
+    def remove(self, key):
+        if key in self._figures:
+            self.graph.delete_figure(self._figures.pop(key))
+            del self._shapes[key]
+            self.deleted += 1
+
+    def clear(self):
+        for key in list(self._figures):
+            self.remove(key)
+        self.drawn_routine = None
+
+    def line(self, key, point_from, point_to, color='black', width=1):
+        self._sync(key, 'line', (_as_tuple(point_from), _as_tuple(point_to)), (color, width))
+
+    def lines(self, key, points, color='black', width=1):
+        # Polyline through all the points, used for sampled curves
+        self._sync(key, 'lines', tuple(_as_tuple(p) for p in points), (color, width))
+
+    def circle(self, key, center, radius, fill_color=None, line_color='black'):
+        self._sync(key, 'circle', (_as_tuple(center), radius), (fill_color, line_color))
+
+    def point(self, key, point, size=2, color='black'):
+        self._sync(key, 'point', (_as_tuple(point), size), (color,))
+
+    def polygon(self, key, points, line_color=None, line_width=None, fill_color=None):
+        self._sync(key, 'polygon', tuple(_as_tuple(p) for p in points), (line_color, line_width, fill_color))
+
+    def text(self, key, text, location, color='black'):
+        self._sync(key, 'text', _as_tuple(location), (str(text), color))
+
+    def _sync(self, key, kind, geometry, style):
+        shape = self._shapes.get(key)
+        if shape is not None and shape[0] != kind:
+            self.remove(key)
+            shape = None
+        draw, coords, options = _FIGURE_KINDS[kind]
+        if shape is None:
+            self._figures[key] = draw(self.graph, geometry, style)
+            self.created += 1
+        else:
+            if shape[1] != geometry:
+                self.graph.TKCanvas.coords(self._figures[key], *coords(self.graph, geometry))
+                self.updated += 1
+            if shape[2] != style:
+                self.graph.TKCanvas.itemconfig(self._figures[key], **options(style))
+                self.updated += 1
+        self._shapes[key] = (kind, geometry, style)
+
+
+class _DrawnRoutine:
+    # The routine a scene shows: the model and its change count when drawn, its number of points, the selected
+    # and colliding paths, the partner models by name and the robots
+
+    def __init__(self, model):
+        self.model = model
+        self.change_count = -1
+        self.count = 0
+        self.selected_path = None
+        self.colliding_paths = frozenset()
+        self.partners = {}
+        self.robots = set()
+
+
+def _remove_partner(scene, name, partner):
+    scene.remove(('partner_start', name))
+    for i in range(1, len(partner.points)):
+        scene.remove(('partner_path', name, i))
+
+
+def _draw_partner(scene, name, partner):
+    if len(partner.points) > 0:
+        scene.circle(('partner_start', name), partner.points[0], 5, fill_color='blue')
+        for i in range(1, len(partner.points)):
+            scene.lines(('partner_path', name, i), partner.samples(i).points, color='blue', width=2.0)
+
+
+def draw_routine(scene, path, robots, selected_path=None, colliding_paths=(), partners=None):
+    # Draw the turn indicators, the robots and the lines between all points of a PathModel. robots maps a key to
+    # the corners and front point of a robot, partners maps a name to the PathModel of a partner routine, drawn
+    # in blue. Only the paths and turns changed since the previous call, the paths that changed color and the
+    # partners that were added or removed are drawn again
+    drawn = scene.drawn_routine
+    if drawn is None or drawn.model is not path:
+        scene.clear()
+        drawn = scene.drawn_routine = _DrawnRoutine(path)
+    count = len(path.points)
+    paths, turn_points = path.changes_since(drawn.change_count)
+
+    partners = partners or {}
+    for name, partner in drawn.partners.items():
+        if partners.get(name) is not partner:
+            _remove_partner(scene, name, partner)
+    for name, partner in partners.items():
+        if drawn.partners.get(name) is not partner:
+            _draw_partner(scene, name, partner)
+
+    for i in range(count, drawn.count):
+        scene.remove(('turn_circle', i))
+        scene.remove(('turn_text', i))
+    for i in turn_points.tolist():
+        angle = path.turns.get(i)
+        if angle is None:
+            scene.remove(('turn_circle', i))
+            scene.remove(('turn_text', i))
+        else:
+            turn_point = path.points[i]
+            scene.circle(('turn_circle', i), turn_point, 5, fill_color='black')
+            scene.text(('turn_text', i), str(angle) + '°', [turn_point[0] + 10, turn_point[1] + 10],
+                       color='dark blue')
+
+    for robot in drawn.robots - robots.keys():
+        scene.remove(('robot', robot))
+        scene.remove(('robot_point', robot))
+    for robot, (corners, front_point) in robots.items():
+        scene.polygon(('robot', robot), corners, line_color='black', line_width='3', fill_color='')
+        scene.point(('robot_point', robot), front_point, size=15, color='yellow')
+
+    # Curved paths are drawn through their cached samples, paths where the robot hits something are red
+    if count > 0:
+        scene.circle('start', path.points[0], 5)
+    else:
+        scene.remove('start')
+    for s in range(max(count, 1), drawn.count):
+        scene.remove(('path', s))
+    colliding_paths = frozenset(colliding_paths)
+    recolored = (colliding_paths ^ drawn.colliding_paths) | {drawn.selected_path, selected_path}
+    for s in set(paths.tolist()) | recolored:
+        if s is not None and 1 <= s < count:
+            line_color = 'black'
+            if s in colliding_paths:
+                line_color = 'red'
+            if selected_path == s:
+                line_color = 'yellow'
+            scene.lines(('path', s), path.samples(s).points, color=line_color, width=2.0)
+
+    drawn.change_count = path.change_count
+    drawn.count = count
+    drawn.selected_path = selected_path
+    drawn.colliding_paths = colliding_paths
+    drawn.partners = dict(partners)
+    drawn.robots = set(robots)
@@ -1,6 +1,10 @@
 # Python Module HelperFunctions
 import math
 
+import numpy as np
+
+import Coordinates as co
+
 
 def generate_path_string(p1, p2, velocity, heading):
     return f'({p1[0]}, {p1[1]}) to ({p2[0]}, {p2[1]}) going {velocity} in/s at {heading}°'
@@ -11,51 +15,120 @@ def generate_turn_string(turn, points):
 
 
 def convert_coordinates_to_inches(points, pixels_per_inch, field_length_inches):
-    converted_points = []
-    for p in points:
-        new_point = [None, None]
-        new_point[0] = p[0] / pixels_per_inch
-        new_point[1] = p[1] / pixels_per_inch
-        new_point[0] -= (field_length_inches / 2.0)
-        new_point[1] -= (field_length_inches / 2.0)
-        new_point[0] = round(new_point[0], 2)
-        new_point[1] = round(new_point[1], 2)
-        converted_points.append(new_point)
-    return converted_points
+    return co.FieldCoordinates(pixels_per_inch, field_length_inches).to_inches(points).tolist()
 
 
 def convert_coordinates_to_pixels(points, pixels_per_inch, field_length_pixels):
-    converted_points = []
-    for p in points:
-        new_point = [None, None]
-        new_point[0] = p[0] * pixels_per_inch
-        new_point[1] = p[1] * pixels_per_inch
-        new_point[0] += (field_length_pixels / 2.0)
-        new_point[1] += (field_length_pixels / 2.0)
-        new_point[0] = round(new_point[0], 2)
-        new_point[1] = round(new_point[1], 2)
-        converted_points.append(new_point)
-    return converted_points
+    coordinates = co.FieldCoordinates(pixels_per_inch, field_length_pixels / pixels_per_inch)
+    return np.round(coordinates.to_pixels(points), 2).tolist()
 
 
 def calculate_movement_per_frame(point1, point2, inches_per_second, frames_per_second, pixels_per_inch):
-    pixels_per_frame = (inches_per_second * pixels_per_inch) / frames_per_second
-    if point2[0] - point1[0] == 0:
-        x_per_frame = 0
-        y_per_frame = pixels_per_frame
-    elif point2[1] - point1[1] == 0:
-        x_per_frame = pixels_per_frame
-        y_per_frame = 0
-    else:
-        x_to_y_ratio = (point2[0] - point1[0]) / (point2[1] - point1[1])
-        y_per_frame = math.sqrt(pixels_per_frame ** 2 / (x_to_y_ratio ** 2 + 1))  # Uses derived formula
-        x_per_frame = x_to_y_ratio * y_per_frame
-    if point2[1] <= point1[1]:
-        y_per_frame *= -1
-        x_per_frame *= -1
-    if point2[0] > point1[0] and y_per_frame == 0.0:
-        x_per_frame *= -1
-    return [x_per_frame, y_per_frame]
+    deltas = movement_per_frame([point1], [point2], inches_per_second, frames_per_second, pixels_per_inch)
+    return deltas[0].tolist()
+
+
+def movement_per_frame(starts, ends, inches_per_second, frames_per_second, pixels_per_inch):
+    # Batched per-frame x/y movement for every segment, zero for segments with no length
+    offsets = np.asarray(ends, dtype=float) - np.asarray(starts, dtype=float)
+    lengths = np.hypot(offsets[:, 0], offsets[:, 1])
+    pixels_per_frame = np.asarray(inches_per_second, dtype=float) * pixels_per_inch / frames_per_second
+    scale = np.divide(pixels_per_frame, lengths, out=np.zeros_like(lengths), where=lengths > 0)
+    return offsets * scale[:, None]
+
+
+def group_steps(counts):
+    # For groups of the given sizes, returns the group of every item and its 1-based step inside the group
+    counts = np.asarray(counts, dtype=np.int64)
+    groups = np.repeat(np.arange(len(counts)), counts)
+    steps = np.arange(1, len(groups) + 1) - np.repeat(np.cumsum(counts) - counts, counts)
+    return groups, steps
+
+
+def interpolate_segments(starts, ends, inches_per_second, frames_per_second, pixels_per_inch):
+    # Positions of every frame driving each segment at constant speed, always ending on the end point.
+    # Returns the frames x 2 position table and how many frames each segment took
+    starts = np.asarray(starts, dtype=float)
+    offsets = np.asarray(ends, dtype=float) - starts
+    lengths = np.hypot(offsets[:, 0], offsets[:, 1])
+    pixels_per_frame = np.broadcast_to(
+        np.asarray(inches_per_second, dtype=float) * pixels_per_inch / frames_per_second, lengths.shape)
+    moving = (lengths > 0) & (pixels_per_frame > 0)
+    counts = np.ones(len(lengths), dtype=np.int64)
+    counts[moving] = np.ceil(lengths[moving] / pixels_per_frame[moving]).astype(np.int64)
+    groups, steps = group_steps(counts)
+    fractions = np.ones(len(groups))
+    moving_frames = moving[groups]
+    fractions[moving_frames] = np.minimum(
+        steps[moving_frames] * pixels_per_frame[groups][moving_frames] / lengths[groups][moving_frames], 1.0)
+    return starts[groups] + offsets[groups] * fractions[:, None], counts
+
+
+def interpolate_polylines(polylines, inches_per_second, frames_per_second, pixels_per_inch):
+    # Like interpolate_segments for sampled paths (Curves.Samples), driving each along its arc length
+    lengths = np.array([p.length for p in polylines])
+    pixels_per_frame = np.broadcast_to(
+        np.asarray(inches_per_second, dtype=float) * pixels_per_inch / frames_per_second, lengths.shape)
+    moving = (lengths > 0) & (pixels_per_frame > 0)
+    counts = np.ones(len(lengths), dtype=np.int64)
+    counts[moving] = np.ceil(lengths[moving] / pixels_per_frame[moving]).astype(np.int64)
+    groups, steps = group_steps(counts)
+    distances = lengths[groups].copy()
+    moving_frames = moving[groups]
+    distances[moving_frames] = np.minimum(steps[moving_frames] * pixels_per_frame[groups][moving_frames],
+                                          distances[moving_frames])
+    return positions_along(polylines, groups, distances), counts
+
+
+def positions_along(polylines, groups, distances):
+    # Position at the given distance along polylines[groups[k]] for every k, looked up in one table of all the
+    # polylines laid end to end
+    if len(polylines) == 0:
+        return np.empty((0, 2))
+    sizes = np.array([len(p.points) for p in polylines])
+    offsets = np.concatenate(([0.0], np.cumsum([p.length for p in polylines])[:-1]))
+    table_lengths = np.concatenate([p.lengths + offset for p, offset in zip(polylines, offsets)])
+    table_points = np.concatenate([p.points for p in polylines])
+    targets = distances + offsets[groups]
+    # Search each frame's own polyline so frames on the end of a path never land on the next one
+    first_sample = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    upper = np.clip(np.searchsorted(table_lengths, targets, side='left'), first_sample[groups] + 1,
+                    first_sample[groups] + sizes[groups] - 1)
+    lower = upper - 1
+    span = table_lengths[upper] - table_lengths[lower]
+    fractions = np.divide(targets - table_lengths[lower], span, out=np.ones_like(span), where=span > 0)
+    return table_points[lower] + (table_points[upper] - table_points[lower]) * fractions[:, None]
+
+
+def interpolate_angles(start_angles, end_angles, degrees_per_second, frames_per_second):
+    # Headings of every frame of each turn at constant rotation speed, always ending on the end angle.
+    # Returns the flat heading table and how many frames each turn took (zero for no-op turns)
+    start_angles = np.asarray(start_angles, dtype=float)
+    delta_angles = np.asarray(end_angles, dtype=float) - start_angles
+    degrees_per_frame = degrees_per_second / frames_per_second
+    counts = np.ceil(np.abs(delta_angles) / degrees_per_frame).astype(np.int64)
+    groups, steps = group_steps(counts)
+    fractions = np.minimum(steps * degrees_per_frame / np.abs(delta_angles[groups]), 1.0)
+    return start_angles[groups] + delta_angles[groups] * fractions, counts
+
+
+def rotation_angles(angle1, angle2, degrees_per_second, frames_per_second):
+    delta_angle = float(angle2) - float(angle1)
+    degrees_per_frame = degrees_per_second / frames_per_second
+    frame_count = abs(int(delta_angle / degrees_per_frame))
+    return float(angle1) + math.copysign(degrees_per_frame, delta_angle) * np.arange(1, frame_count + 1)
+
+
+def rotate_corners(corners, angles):
+    # Frames x corners x 2 table of rotated corner offsets, using the clockwise rotation matrix
+    corners = np.asarray(corners, dtype=float)
+    radians = np.radians(np.asarray(angles, dtype=float))[:, None]
+    sin_a = np.sin(radians)
+    cos_a = np.cos(radians)
+    table = np.empty((len(radians), len(corners), 2))
+    table[..., 0] = corners[:, 0] * sin_a + corners[:, 1] * cos_a
+    table[..., 1] = corners[:, 0] * cos_a - corners[:, 1] * sin_a
+    return table
 
 
 def clean_coordinates(coord=''):
@@ -69,40 +142,23 @@ def clean_coordinates(coord=''):
     return string
 
 
+def parse_number(text):
+    # Number typed into an entry field or popup, anything other than digits, '.' and '-' (units, spaces) is
+    # ignored. None when no number is left, for an empty field, a lone '-' or '1.2.3' for example
+    if text is None:
+        return None
+    string = ''.join(c for c in text if c.isdigit() or c == '.' or c == '-')
+    try:
+        number = float(string)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
 def sort_turns(turns):
-    if len(turns) > 0:
-        sorted_turns = [turns[0]]
-        for t in turns:
-            if t is turns[0]:
-                continue
-            for st in sorted_turns:
-                if t[0] < st[0]:
-                    sorted_turns.insert(0, t)
-                    break
-            if not sorted_turns.__contains__(t):
-                sorted_turns.append(t)
-        return sorted_turns
-    return turns
+    return sorted(turns, key=lambda t: t[0])
 
 
 def calculate_rotation_per_frame(points, angle1, angle2, degrees_per_second, frames_per_second):
-    deltas = []
-    for p in points:
-        point_deltas = [[], []]
-        delta_angle = float(angle2) - float(angle1)
-        degrees_per_frame = degrees_per_second / frames_per_second
-        frame_count = abs(int(delta_angle / degrees_per_frame))
-        current_angle = float(angle1)
-        for i in range(0, frame_count):
-            current_angle += degrees_per_frame * math.copysign(1.0, delta_angle)
-            # Use clockwise rotation matrix
-            point_deltas[0].append(
-                p[0] * math.sin(math.radians(current_angle)) + p[1] * math.cos(math.radians(current_angle)))
-            point_deltas[1].append(
-                p[0] * math.cos(math.radians(current_angle)) - p[1] * math.sin(math.radians(current_angle)))
-            # if i == frame_count - 1:  # Account for uneven division of degrees into frames
-            # angle2 = float(angle2)
-            # point_deltas[0][i] = (p[0]*math.sin(math.radians(angle2-current_angle)) + p[1]*math.cos(math.radians(angle2-current_angle)))
-            # point_deltas[1][i] = p[0]*(math.cos(math.radians(angle2-current_angle)) - p[1]*math.sin(math.radians(angle2-current_angle)))
-        deltas.append(point_deltas)
-    return deltas
+    table = rotate_corners(points, rotation_angles(angle1, angle2, degrees_per_second, frames_per_second))
+    return [[table[:, i, 0].tolist(), table[:, i, 1].tolist()] for i in range(len(points))]
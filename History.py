@@ -0,0 +1,184 @@
+# Python Module History
+# Undo and redo for the edits of a PathModel. Every edit goes through History.do, which records the edit
+# together with the operations that reverse it. Small edits are reversed by another small edit (a moved point
+# is moved back, a deleted point is inserted again), so undoing one costs about as much as making it no
+# matter how long the path is. Round All and set_points keep the index and old position of only the points they
+# move. Mirror, Clear and Load can change every column, so they keep a full copy of each column instead: a column
+# holding the same values as the previous snapshot shares its array (repeatedly loading and clearing the same
+# routine keeps one copy), any other costs memory in proportion to the routine, so mirroring back and forth a
+# thousand times keeps a thousand copies of the points. Only the newest `depth` edits are kept.
+import collections
+
+import numpy as np
+
+DEFAULT_DEPTH = 1000
+
+
+class _Entry:
+
+    __slots__ = ('operation', 'arguments', 'inverse', 'merge_key')
+
+    def __init__(self, operation, arguments, inverse, merge_key):
+        # The edit as a PathModel method name and its arguments, and the (method name, arguments) pairs undoing it
+        self.operation = operation
+        self.arguments = arguments
+        self.inverse = inverse
+        self.merge_key = merge_key
+
+
+class History:
+
+    def __init__(self, model, depth=DEFAULT_DEPTH):
+        self.model = model
+        self._undo = collections.deque(maxlen=depth)
+        self._redo = []
+        self._shared = {}
+
+    @property
+    def can_undo(self):
+        return len(self._undo) > 0
+
+    @property
+    def can_redo(self):
+        return len(self._redo) > 0
+
+    def do(self, operation, *arguments, merge_key=None):
+        # Apply an edit of the model, edits with the same merge_key as the previous one (the keystrokes typed
+        # into one entry field for example) are undone together
+        entry = self._record(operation, arguments, merge_key)
+        last = self._undo[-1] if len(self._undo) > 0 else None
+        if merge_key is not None and last is not None and last.merge_key == merge_key and len(self._redo) == 0:
+            last.operation = operation
+            last.arguments = arguments
+        else:
+            self._undo.append(entry)
+        self._redo.clear()
+
+    def undo(self):
+        if len(self._undo) > 0:
+            entry = self._undo.pop()
+            for operation, arguments in entry.inverse:
+                self._apply(operation, arguments)
+            self._redo.append(entry)
+
+    def redo(self):
+        if len(self._redo) > 0:
+            entry = self._redo.pop()
+            self._undo.append(self._record(entry.operation, entry.arguments, None))
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._shared.clear()
+
+    def _record(self, operation, arguments, merge_key):
+        inverse = getattr(self, '_inverse_' + operation)(*arguments)
+        self._apply(operation, arguments)
+        return _Entry(operation, arguments, inverse, merge_key)
+
+    def _apply(self, operation, arguments):
+        if operation == 'restore':
+            self._restore(*arguments)
+        elif operation == 'restore_rows':
+            self._restore_rows(*arguments)
+        else:
+            getattr(self.model, operation)(*arguments)
+
+    # Snapshots
+
+    def _column(self, name, values):
+        # Read only copy of a column, shared with the previous snapshot of that column when nothing changed
+        previous = self._shared.get(name)
+        if previous is not None and previous.shape == values.shape and np.array_equal(previous, values):
+            return previous
+        copy = np.array(values)
+        copy.flags.writeable = False
+        self._shared[name] = copy
+        return copy
+
+    def _snapshot(self):
+        model = self.model
+        return ('restore', (self._column('points', model.points), list(model.turns),
+                            self._column('velocities', model.velocities), model.start_heading,
+                            self._column('segments', model.segments), self._column('handles', model.handles)))
+
+    def _restore(self, points, turns, velocities, start_heading, segments, handles):
+        self.model.load(points, turns, velocities, start_heading, segments, handles)
+
+    def _moved_rows(self, points):
+        # Indices of the points that moving every point to `points` changes, with their current positions
+        current = self.model.points
+        moved = np.nonzero(np.any(current != np.asarray(points, dtype=float), axis=1))[0]
+        return ('restore_rows', (moved, current[moved].copy()))
+
+    def _restore_rows(self, indices, rows):
+        if len(indices) > 0:
+            points = np.array(self.model.points)
+            points[indices] = rows
+            self.model.set_points(points)
+
+    # Inverse of every edit, worked out before the edit is applied
+
+    def _inverse_add_point(self, x, y):
+        return [('delete_point', (len(self.model),))]
+
+    def _inverse_move_point(self, i, x, y):
+        row = self.model.row(i)
+        return [('move_point', (i, row[0], row[1]))]
+
+    def _inverse_set_start_point(self, x, y):
+        if len(self.model) == 0:
+            return [('delete_point', (0,))]
+        return self._inverse_move_point(0, x, y)
+
+    def _inverse_delete_point(self, i):
+        model = self.model
+        inverse = [('insert_point', (i,) + model.row(i))]
+        if i + 1 < len(model):
+            # Deleting merges the path after the point into the one before it
+            _, _, velocity, segment, handles = model.row(i + 1)
+            inverse += [('set_segment_type', (i + 1, segment)), ('set_handles', (i + 1, handles)),
+                        ('set_velocity', (i + 1, velocity))]
+        if i in model.turns:
+            inverse.append(('add_turn', (i, model.turns.get(i))))
+        return inverse
+
+    def _inverse_set_velocity(self, s, velocity):
+        return [('set_velocity', (s, self.model.row(s)[2]))]
+
+    def _inverse_set_segment_type(self, s, kind):
+        _, _, _, segment, handles = self.model.row(s)
+        return [('set_segment_type', (s, segment)), ('set_handles', (s, handles))]
+
+    def _inverse_set_handles(self, s, handles):
+        return [('set_handles', (s, self.model.row(s)[4]))]
+
+    def _inverse_set_start_heading(self, heading):
+        return [('set_start_heading', (self.model.start_heading,))]
+
+    def _inverse_add_turn(self, i, angle):
+        if i in self.model.turns:
+            return [('add_turn', (i, self.model.turns.get(i)))]
+        return [('remove_turn', (i,))]
+
+    def _inverse_remove_turn(self, i):
+        return [('add_turn', (i, self.model.turns.get(i)))]
+
+    def _inverse_set_turn_angle(self, k, angle):
+        return [('set_turn_angle', (k, self.model.turns.nth(k - 1)[1]))]
+
+    def _inverse_mirror(self):
+        # Not a second mirror, 720 - (720 - x) is not always x in floating point
+        return [self._snapshot()]
+
+    def _inverse_snap(self, mode='1 in'):
+        return [self._moved_rows(self.model.coordinates.snap(self.model.points, mode))]
+
+    def _inverse_set_points(self, points):
+        return [self._moved_rows(points)]
+
+    def _inverse_clear(self):
+        return [self._snapshot()]
+
+    def _inverse_load(self, points, turns, velocities, start_heading, segments=None, handles=None):
+        return [self._snapshot()]
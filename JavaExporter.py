@@ -0,0 +1,120 @@
+# Python Module JavaExporter
+# Generates the autonomous OpMode Java class for a routine. Used by the studio's Export Field button and from
+# the command line to regenerate a class for every save in a directory, for example:
+#   python JavaExporter.py saves/ -o TeamCode/src/main/java/org/firstinspires/ftc/teamcode
+# With --simplify every routine goes through Simplify first, dropping waypoints and turns that do not change
+# where the robot goes.
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import AutonFile as af
+import Coordinates as co
+import Curves as cu
+import MotionProfile as mp
+import Simplify as si
+
+# Largest distance in inches between a curved path and the straight drives it is exported as
+EXPORT_TOLERANCE = 0.5
+
+
+def class_name_for(save_name):
+    # 'red side-park' -> 'RedSidePark', Java class names cannot start with a digit
+    words = re.findall(r'[A-Za-z0-9]+', save_name)
+    class_name = ''.join(w[0].upper() + w[1:] for w in words)
+    if class_name == '' or class_name[0].isdigit():
+        class_name = 'Auton' + class_name
+    return class_name
+
+
+def write_opmode(stream, routine, class_name='AutonPath', coordinates=co.FIELD):
+    converted_points = coordinates.to_inches(routine.points).tolist()
+    turn_angles = {t[0]: t[1] for t in routine.turns}
+    write = stream.write
+    write('package org.firstinspires.ftc.teamcode;\n\n')
+    write('import com.qualcomm.robotcore.eventloop.opmode.Autonomous;\n\n')
+    write('@Autonomous\n')
+    write(f'public class {class_name} extends PositionBasedAuton3 {{\n')
+    write('public void setStartPos(){\n')
+    write(f'startX = {converted_points[0][0]}; startY = {converted_points[0][1]};\n')
+    write(f'startOrientation = {routine.start_heading};\n')
+    write('}\n\n')
+    write('public void drive(){\n')
+    heading = routine.start_heading
+    for i in range(1, len(converted_points)):
+        if i - 1 in turn_angles:
+            heading = turn_angles[i - 1]
+            write(f'turn({heading},TURN_SPEED,positioning);\n')
+        # A curved path is driven through its samples, a straight one straight to its end point
+        if routine.segments is not None and routine.segments[i - 1] != cu.LINE:
+            samples = cu.sample(routine.segments[i - 1], routine.points, i, routine.handles[i - 1],
+                                coordinates.length_to_pixels(EXPORT_TOLERANCE))
+            targets = coordinates.to_inches(samples.points[1:]).tolist()
+        else:
+            targets = [converted_points[i]]
+        for target in targets:
+            write(f'driveToPosition({target[0]},{target[1]},DRIVE_SPEED,{heading},0,0,positioning,sensing);\n')
+    write('}}')
+
+
+def export_file(save_path, output_directory, simplify_tolerance=None, drivetrain='Mechanum with Odometry'):
+    # Returns the path of the class written and, when the routine was simplified, the Simplify result
+    routine = af.load(save_path)
+    if len(routine.points) == 0:
+        raise ValueError(f'{save_path} has no points to export')
+    simplified = None
+    if simplify_tolerance is not None:
+        simplified = si.simplify(routine, simplify_tolerance, mp.DRIVETRAIN_LIMITS[drivetrain])
+        routine = simplified.routine
+    class_name = class_name_for(os.path.splitext(os.path.basename(save_path))[0])
+    output_path = os.path.join(output_directory, class_name + '.java')
+    with open(output_path, 'w') as java_file:
+        write_opmode(java_file, routine, class_name)
+    return output_path, simplified
+
+
+def export_directory(save_directory, output_directory, jobs=None, simplify_tolerance=None,
+                     drivetrain='Mechanum with Odometry'):
+    save_paths = sorted(os.path.join(save_directory, name) for name in os.listdir(save_directory)
+                        if name.endswith('.auton'))
+    class_names = [class_name_for(os.path.splitext(os.path.basename(p))[0]) for p in save_paths]
+    for class_name in set(class_names):
+        if class_names.count(class_name) > 1:
+            raise ValueError(f'more than one save would be exported as {class_name}.java')
+    os.makedirs(output_directory, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(export_file, save_path, output_directory, simplify_tolerance, drivetrain)
+                   for save_path in save_paths]
+        return [(save_path,) + future.result() for save_path, future in zip(save_paths, futures)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate an autonomous OpMode class for every .auton save '
+                                                 'in a directory.')
+    parser.add_argument('saves', help='directory holding the .auton saves')
+    parser.add_argument('-o', '--output', default='.', help='directory to write the .java files to')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: all cores)')
+    parser.add_argument('--simplify', type=float, nargs='?', const=si.DEFAULT_TOLERANCE, default=None,
+                        metavar='INCHES', help='drop waypoints within this many inches of a straight drive and turns '
+                                               f'to the current heading (default: {si.DEFAULT_TOLERANCE:g} in)')
+    parser.add_argument('--drivetrain', choices=list(mp.DRIVETRAIN_LIMITS), default='Mechanum with Odometry',
+                        help='drivetrain the time saved by --simplify is estimated for')
+    args = parser.parse_args(argv)
+    try:
+        exported = export_directory(args.saves, args.output, args.jobs, args.simplify, args.drivetrain)
+    except (OSError, ValueError) as error:
+        print(f'Export failed: {error}', file=sys.stderr)
+        return 1
+    for save_path, output_path, simplified in exported:
+        if simplified is None:
+            print(f'{save_path} -> {output_path}')
+        else:
+            print(f'{save_path} -> {output_path} ({simplified.removed_points} points and {simplified.removed_turns} '
+                  f'turns removed, about {simplified.time_saved:.2f} s saved)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
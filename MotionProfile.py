@@ -0,0 +1,142 @@
+# Python Module MotionProfile
+# Timing of a routine as the robot really drives it: every path and turn speeds up from a stop, cruises and
+# slows down to a stop within the limits of the drivetrain. With a jerk limit the acceleration ramps up and
+# down too (S-curve profile), without one it switches on and off (trapezoidal profile). A profile table holds
+# the distance covered at every frame, tables are cached by distance, speed and limits so only the paths and
+# turns that were edited get new tables.
+import collections
+import functools
+import math
+
+import numpy as np
+
+# Linear limits in inches and seconds, angular limits in degrees and seconds, jerk None for a trapezoidal profile
+Limits = collections.namedtuple('Limits', ['max_velocity', 'max_acceleration', 'max_jerk', 'max_angular_velocity',
+                                           'max_angular_acceleration', 'max_angular_jerk'])
+
+DRIVETRAIN_LIMITS = {
+    'Mechanum with Odometry': Limits(60, 60, 240, 180, 360, 1440),
+    'Mechanum without Odometry': Limits(48, 40, 160, 135, 270, 1080),
+    'H-Drive with Odometry': Limits(54, 50, None, 160, 320, None),
+    'H-Drive without Odometry': Limits(42, 36, None, 120, 240, None),
+}
+
+# The profile is integrated this many times per frame before it is sampled at the frames
+OVERSAMPLING = 8
+
+
+def _ramp(velocity, max_acceleration, max_jerk):
+    # Peak acceleration, time spent changing the acceleration and time at the peak to get from 0 to velocity.
+    # Works on single speeds and on arrays of them, speeds must be above 0
+    if max_jerk is None:
+        return max_acceleration, 0.0 * velocity, velocity / max_acceleration
+    peak = np.minimum(max_acceleration, np.sqrt(velocity * max_jerk))
+    jerk_time = peak / max_jerk
+    return peak, jerk_time, velocity / peak - jerk_time
+
+
+def _ramp_distance(velocity, max_acceleration, max_jerk):
+    # The speed up is symmetric about its middle, so the average speed is half the final one
+    _, jerk_time, constant_time = _ramp(velocity, max_acceleration, max_jerk)
+    return velocity * (2 * jerk_time + constant_time) / 2
+
+
+def _reachable_velocity(distance, max_acceleration, max_jerk):
+    # Speed at which speeding up and slowing down take exactly the distance, solved from _ramp_distance: with
+    # a jerk limit the ramp is v^1.5 / sqrt(jerk) long while the peak acceleration stays below the limit and
+    # v (acceleration / jerk + v / acceleration) / 2 once it reaches it
+    if max_jerk is None:
+        return np.sqrt(distance * max_acceleration)
+    limit_velocity = max_acceleration ** 2 / max_jerk
+    limit_distance = 2 * limit_velocity ** 1.5 / math.sqrt(max_jerk)
+    ratio = max_acceleration / max_jerk
+    below = (np.maximum(distance, 0.0) * math.sqrt(max_jerk) / 2) ** (2 / 3)
+    above = max_acceleration / 2 * (np.sqrt(ratio ** 2 + 4 * np.maximum(distance, 0.0) / max_acceleration) - ratio)
+    return np.where(distance <= limit_distance, below, above)
+
+
+def _cruise_velocity(distance, velocity, max_acceleration, max_jerk):
+    # Highest speed up to velocity that leaves room to speed up and slow down within the distance
+    return np.minimum(velocity, _reachable_velocity(distance, max_acceleration, max_jerk))
+
+
+def _velocity_at(times, velocity, peak, jerk_time, constant_time, total_time):
+    # Speed of the profile at the given times, slowing down mirrors speeding up
+    ramp_time = 2 * jerk_time + constant_time
+    ramp = np.minimum(times, total_time - times).clip(0.0, ramp_time)
+    jerk = peak / jerk_time if jerk_time > 0 else 0.0
+    speeds = np.where(ramp < jerk_time, 0.5 * jerk * ramp ** 2,
+                      np.where(ramp < jerk_time + constant_time,
+                               0.5 * jerk * jerk_time ** 2 + peak * (ramp - jerk_time),
+                               velocity - 0.5 * jerk * (ramp_time - ramp) ** 2))
+    return np.minimum(speeds, velocity)
+
+
+def durations(distances, velocities, max_acceleration, max_jerk):
+    # Seconds to cover every distance from a stop to a stop at (up to) its velocity, 0 where there is nothing
+    # to cover
+    distances = np.asarray(distances, dtype=float)
+    velocities = np.broadcast_to(np.asarray(velocities, dtype=float), distances.shape)
+    moving = (distances > 0) & (velocities > 0)
+    cruise = np.where(moving, _cruise_velocity(distances, velocities, max_acceleration, max_jerk), 1.0)
+    _, jerk_time, constant_time = _ramp(cruise, max_acceleration, max_jerk)
+    ramp_time = 2 * jerk_time + constant_time
+    cruise_time = np.maximum(distances - cruise * ramp_time, 0.0) / cruise
+    return np.where(moving, 2 * ramp_time + cruise_time, 0.0)
+
+
+def duration(distance, velocity, max_acceleration, max_jerk):
+    # Seconds to cover the distance from a stop to a stop
+    return float(durations(float(distance), float(velocity), max_acceleration, max_jerk))
+
+
+@functools.lru_cache(maxsize=4096)
+def profile(distance, velocity, max_acceleration, max_jerk, frames_per_second):
+    # Distance covered at the end of every frame, the last one always being the whole distance. Empty when
+    # there is nothing to cover. The table is shared between callers and must not be changed
+    if distance <= 0 or velocity <= 0:
+        table = np.empty(0)
+    else:
+        cruise = float(_cruise_velocity(distance, velocity, max_acceleration, max_jerk))
+        peak, jerk_time, constant_time = (float(v) for v in _ramp(cruise, max_acceleration, max_jerk))
+        total_time = duration(distance, velocity, max_acceleration, max_jerk)
+        frame_count = max(int(math.ceil(total_time * frames_per_second - 1e-9)), 1)
+        times = np.linspace(0.0, total_time, frame_count * OVERSAMPLING + 1)
+        speeds = _velocity_at(times, cruise, peak, jerk_time, constant_time, total_time)
+        covered = np.concatenate(([0.0], np.cumsum((speeds[1:] + speeds[:-1]) / 2 * np.diff(times))))
+        # Integration error is spread over the whole profile so it ends exactly on the distance
+        covered *= distance / covered[-1]
+        frame_times = np.minimum(np.arange(1, frame_count + 1) / frames_per_second, total_time)
+        table = np.interp(frame_times, times, covered)
+        table[-1] = distance
+    table.flags.writeable = False
+    return table
+
+
+def path_tables(lengths, velocities, limits, frames_per_second):
+    # Profile tables of driving every path (lengths in inches), returned flat with the frame count of each path
+    tables = [profile(float(length), float(min(velocity, limits.max_velocity)), limits.max_acceleration,
+                      limits.max_jerk, frames_per_second) for length, velocity in zip(lengths, velocities)]
+    # A path the robot does not move on still takes a frame, like in the constant speed model
+    return _flatten([t if len(t) > 0 else np.array([float(length)]) for t, length in zip(tables, lengths)])
+
+
+def turn_tables(angles, limits, frames_per_second):
+    # Profile tables of turning through every angle (in degrees, sign ignored)
+    tables = [profile(abs(float(angle)), float(limits.max_angular_velocity), limits.max_angular_acceleration,
+                      limits.max_angular_jerk, frames_per_second) for angle in angles]
+    return _flatten(tables)
+
+
+def _flatten(tables):
+    counts = np.array([len(t) for t in tables], dtype=np.int64)
+    return (np.concatenate(tables) if len(tables) > 0 else np.empty(0)), counts
+
+
+def routine_time(lengths, velocities, turn_angles, limits):
+    # Seconds to drive a routine, every path and turn starting and ending at a stop
+    lengths = np.asarray(lengths, dtype=float)
+    velocities = np.minimum(np.asarray(velocities, dtype=float)[:len(lengths)], limits.max_velocity)
+    seconds = durations(lengths, velocities, limits.max_acceleration, limits.max_jerk).sum()
+    return float(seconds + durations(np.abs(np.asarray(turn_angles, dtype=float)), limits.max_angular_velocity,
+                                     limits.max_angular_acceleration, limits.max_angular_jerk).sum())
@@ -0,0 +1,245 @@
+# Python Module Optimizer
+# Shortens the time a routine takes by simulated annealing over its waypoint positions, the points its turns
+# are placed on and its path velocities. A candidate routine costs the time its motion profiles take plus a
+# penalty for every place the robot's footprint hits a wall or field element, so the best routine found is
+# collision free whenever one was found. The start and end points stay where they are and every other point
+# stays within max_shift_inches of where it was placed, the routine still visits the same places.
+#
+# Several independent annealing chains run at once in a process pool, each from its own seed, and the best
+# routine of all of them wins. Candidates are evaluated without compiling frames: lengths come from the sampled
+# paths, time from MotionProfile.routine_time and collisions from footprints placed along the paths every
+# COLLISION_SPACING pixels, checked in one batch by Collision.ObstacleSet. While the best routine found still
+# hits something, another round of chains continues from it, up to max_rounds rounds, so a routine that still
+# collides is only returned when no collision free one was found.
+#
+# The studio runs the search with start_optimizing, which works on a background thread and hands the Result back
+# to the window as a RESULT_EVENT. The pool spawns its processes instead of forking the studio, which has the Tk
+# and simulation threads running.
+import collections
+import math
+import multiprocessing
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import Coordinates as co
+import Curves as cu
+import HelperFunctions as hf
+import MotionProfile as mp
+import Trajectory as traj
+
+# Seconds added to the cost for every footprint that hits an obstacle
+COLLISION_PENALTY = 10.0
+# Pixels between two footprints checked along a path, and degrees between two checked while turning
+COLLISION_SPACING = 10
+TURN_SPACING = 15
+MIN_VELOCITY = 6.0
+MAX_ROUNDS = 4
+# Sampled paths and their collision counts kept per chain, a candidate only changes one or two paths
+CACHE_SIZE = 20000
+
+RESULT_EVENT = '-OPTIMIZER_RESULT-'
+
+Result = collections.namedtuple('Result', ['points', 'turns', 'velocities', 'time_before', 'time_after',
+                                           'collisions_before', 'collisions_after'])
+
+
+class _Problem:
+    # Everything about the routine that the search does not change, shared by all candidates of a chain
+
+    def __init__(self, points, turns, velocities, start_heading, limits, obstacles, corners, segments, handles,
+                 coordinates, max_shift_inches):
+        self.origin = np.asarray(points, dtype=float)
+        self.turn_angles = np.array([float(t[1]) for t in turns])
+        self.velocities = np.asarray(velocities, dtype=float)
+        self.start_heading = float(start_heading)
+        self.limits = limits
+        self.obstacles = obstacles
+        self.corners = corners
+        self.segments = segments
+        self.handles = handles
+        self.coordinates = coordinates
+        self.max_shift = coordinates.length_to_pixels(max_shift_inches)
+        # A turn on the last point is never driven, it is left where it is
+        self.last_turn_point = len(points) - 2
+        self._samples = {}
+        self._collisions = {}
+
+    def __getstate__(self):
+        # The caches stay behind when the problem is sent to a worker process
+        state = dict(self.__dict__)
+        state['_samples'] = {}
+        state['_collisions'] = {}
+        return state
+
+    def headings(self, turn_points):
+        # Heading before and after the turn on the start point of every path
+        turn_at = dict(zip(turn_points.tolist(), self.turn_angles.tolist()))
+        before, after = [], []
+        heading = self.start_heading
+        for i in range(len(self.origin) - 1):
+            before.append(heading)
+            heading = turn_at.get(i, heading)
+            after.append(heading)
+        return np.array(before), np.array(after)
+
+    def _path_keys(self, points):
+        # A path's samples depend on its own points and, for some segment types, on the points around them
+        return [(s, points[max(s - 2, 0):s + 2].tobytes()) for s in range(1, len(points))]
+
+    def _sample(self, points, keys):
+        if len(self._samples) > CACHE_SIZE:
+            self._samples.clear()
+        paths = []
+        for key in keys:
+            samples = self._samples.get(key)
+            if samples is None:
+                s = key[0]
+                kind = cu.LINE if self.segments is None else int(self.segments[s - 1])
+                samples = cu.sample(kind, points, s, None if self.handles is None else self.handles[s - 1])
+                self._samples[key] = samples
+            paths.append(samples)
+        return paths
+
+    def cost(self, points, turn_points, velocities):
+        # (cost, seconds, colliding footprints) of a candidate
+        keys = self._path_keys(points)
+        paths = self._sample(points, keys)
+        before, after = self.headings(turn_points)
+        lengths = self.coordinates.length_to_inches(np.array([p.length for p in paths]))
+        seconds = mp.routine_time(lengths, velocities, after - before, self.limits)
+        collisions = self.collisions(points, paths, keys, before, after)
+        return seconds + COLLISION_PENALTY * collisions, seconds, collisions
+
+    def collisions(self, points, paths, keys, before, after):
+        # Footprints hitting an obstacle, counted per path (turn on its start point included) and only counted
+        # again for the paths whose samples or headings changed
+        if len(self.obstacles) == 0:
+            return 0
+        if len(self._collisions) > CACHE_SIZE:
+            self._collisions.clear()
+        path_keys = [(key, before[s], after[s]) for s, key in enumerate(keys)]
+        changed = [s for s, key in enumerate(path_keys) if key not in self._collisions]
+        if len(changed) > 0:
+            counts = self._count_collisions(points[changed], [paths[s] for s in changed], before[changed],
+                                            after[changed])
+            for s, count in zip(changed, counts):
+                self._collisions[path_keys[s]] = count
+        return sum(self._collisions[key] for key in path_keys)
+
+    def _count_collisions(self, starts, paths, before, after):
+        # Colliding footprints of every path: along it at its heading after the turn and on its start point
+        # while turning
+        counts = np.array([int(math.ceil(p.length / COLLISION_SPACING)) + 1 for p in paths])
+        groups, steps = hf.group_steps(counts)
+        lengths = np.array([p.length for p in paths])
+        distances = np.minimum((steps - 1) * COLLISION_SPACING, lengths[groups])
+        positions = hf.positions_along(paths, groups, distances)
+        headings = after[groups]
+        turn_counts = (np.abs(after - before) // TURN_SPACING).astype(np.int64)
+        turn_groups, turn_steps = hf.group_steps(turn_counts)
+        turn_headings = before[turn_groups] + np.sign(after - before)[turn_groups] * turn_steps * TURN_SPACING
+        positions = np.concatenate((positions, starts[turn_groups]))
+        headings = np.concatenate((headings, turn_headings))
+        footprints = hf.rotate_corners(self.corners, headings) + positions[:, None, :]
+        colliding = self.obstacles.colliding_frames(footprints)
+        return np.bincount(np.concatenate((groups, turn_groups))[colliding], minlength=len(paths)).tolist()
+
+    def neighbor(self, generator, points, turn_points, velocities, temperature):
+        # A random small change of one waypoint, turn or velocity, larger while the temperature is high
+        points, turn_points, velocities = points.copy(), turn_points.copy(), velocities.copy()
+        movable = len(self.origin) - 2
+        choice = generator.random()
+        if movable > 0 and choice < 0.5:
+            i = generator.randrange(1, movable + 1)
+            step = self.max_shift * max(temperature, 0.05)
+            moved = points[i] + [generator.gauss(0, step), generator.gauss(0, step)]
+            offset = moved - self.origin[i]
+            distance = math.hypot(offset[0], offset[1])
+            if distance > self.max_shift:
+                moved = self.origin[i] + offset * (self.max_shift / distance)
+            points[i] = np.clip(moved, 0, self.coordinates.field_length_pixels)
+        elif len(turn_points) > 0 and choice < 0.7:
+            k = generator.randrange(len(turn_points))
+            target = turn_points[k] + generator.choice((-1, 1))
+            # Turns keep their order and never share a point
+            low = turn_points[k - 1] + 1 if k > 0 else 0
+            high = turn_points[k + 1] - 1 if k + 1 < len(turn_points) else self.last_turn_point
+            if low <= target <= high and turn_points[k] <= self.last_turn_point:
+                turn_points[k] = target
+        elif len(velocities) > 0:
+            s = generator.randrange(len(velocities))
+            step = self.limits.max_velocity * max(temperature, 0.05) / 2
+            velocities[s] = min(max(velocities[s] + generator.gauss(0, step), MIN_VELOCITY),
+                                self.limits.max_velocity)
+        return points, turn_points, velocities
+
+
+def _anneal(problem, start, iterations, seed):
+    # One annealing chain from the (points, turn points, velocities) start, returns the best (cost, seconds,
+    # collisions, points, turn points, velocities) found
+    generator = random.Random(seed)
+    current = (np.array(start[0], dtype=float), np.asarray(start[1], dtype=np.int64),
+               np.array(start[2], dtype=float))
+    current_cost = problem.cost(*current)
+    best = (current_cost, current)
+    start_temperature = max(current_cost[1], 1.0) * 0.05
+    for iteration in range(iterations):
+        fraction = 1.0 - iteration / iterations
+        candidate = problem.neighbor(generator, *current, fraction)
+        candidate_cost = problem.cost(*candidate)
+        delta = candidate_cost[0] - current_cost[0]
+        temperature = start_temperature * fraction
+        if delta <= 0 or (temperature > 0 and generator.random() < math.exp(-delta / temperature)):
+            current, current_cost = candidate, candidate_cost
+            if current_cost[0] < best[0][0]:
+                best = (current_cost, current)
+    (cost, seconds, collisions), (points, turn_points, velocities) = best
+    return cost, seconds, collisions, points, turn_points, velocities
+
+
+def optimize(points, turns, velocities, start_heading, limits, obstacles, corners=traj.ROBOT_CORNERS,
+             segments=None, handles=None, iterations=2000, chains=None, seed=0, max_shift_inches=6.0,
+             coordinates=co.FIELD, jobs=None, max_rounds=MAX_ROUNDS):
+    # Fastest collision free version of a routine found by rounds of `chains` annealing chains of `iterations`
+    # candidates each, run on `jobs` processes (default: all cores). The result's collisions_after is above 0 when
+    # no collision free routine was found
+    turns = sorted([int(t[0]), float(t[1])] for t in turns)
+    if len(points) < 2:
+        return None
+    problem = _Problem(points, turns, velocities, start_heading, limits, obstacles, corners, segments, handles,
+                       coordinates, max_shift_inches)
+    turn_points = [t[0] for t in turns]
+    _, time_before, collisions_before = problem.cost(problem.origin, np.asarray(turn_points, dtype=np.int64),
+                                                     problem.velocities)
+    chains = chains if chains is not None else (os.cpu_count() or 1)
+    best = None
+    start = (problem.origin, turn_points, problem.velocities)
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn')) as executor:
+        for round_number in range(max_rounds):
+            futures = [executor.submit(_anneal, problem, start, iterations, seed + round_number * chains + chain)
+                       for chain in range(chains)]
+            round_best = min((future.result() for future in futures), key=lambda r: r[0])
+            if best is None or round_best[0] < best[0]:
+                best = round_best
+            if best[2] == 0:
+                break
+            start = best[3:]
+    _, seconds, collisions, best_points, best_turn_points, best_velocities = best
+    return Result(points=best_points.tolist(),
+                  turns=[[int(i), angle] for i, (_, angle) in zip(best_turn_points, turns)],
+                  velocities=best_velocities.tolist(), time_before=time_before, time_after=seconds,
+                  collisions_before=collisions_before, collisions_after=collisions)
+
+
+def start_optimizing(window, *arguments, **keywords):
+    # Run optimize with the given arguments on a background thread, its Result (None for a routine without a
+    # point to move) comes back to the window as a RESULT_EVENT whose value is the result
+    def run():
+        window.write_event_value(RESULT_EVENT, optimize(*arguments, **keywords))
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
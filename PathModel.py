@@ -0,0 +1,439 @@
+# Python Module PathModel
+# Holds the points, turns and velocities edited in the studio together with everything derived from them
+# (inch coordinates, the heading of every path and the strings shown in the path and turn lists).
+# Points live in contiguous NumPy columns with one row per point: x and y in field pixels, the velocity, heading,
+# segment type (see Curves) and Bezier handles of the path that ends on the point. Paths are numbered from 1, path s goes from point s - 1 to
+# point s, so row 0 has no velocity or heading. The columns grow by doubling their capacity, points,
+# velocities and inches() are views or arrays computed from them when asked for and are only valid until the
+# next edit. Headings, sampled paths and list strings are cached and every edit only clears the entries it
+# affects. Every edit also stamps the paths and turns whose figures on the field changed with a running change
+# count, so the field only redraws what changed since it was last drawn.
+import numpy as np
+
+import Coordinates as co
+import Curves as cu
+import HelperFunctions as hf
+import MotionProfile as mp
+import SpatialIndex as si
+import TurnIndex as ti
+
+
+class Waypoint:
+    # Lightweight view of one row of a PathModel
+
+    __slots__ = ('model', 'index')
+
+    def __init__(self, model, index):
+        self.model = model
+        self.index = index
+
+    @property
+    def x(self):
+        return float(self.model._xy[self.index, 0])
+
+    @property
+    def y(self):
+        return float(self.model._xy[self.index, 1])
+
+    @property
+    def inches(self):
+        return self.model.converted_point(self.index)
+
+    @property
+    def velocity(self):
+        # Velocity of the path ending on this point, None for the start point
+        return float(self.model._velocity[self.index]) if self.index > 0 else None
+
+    @property
+    def heading(self):
+        return self.model.heading(self.index) if self.index > 0 else None
+
+    @property
+    def turn(self):
+        return self.model.turns.get(self.index)
+
+
+class PathModel:
+
+    def __init__(self, coordinates=co.FIELD, default_velocity=48, capacity=16):
+        self.coordinates = coordinates
+        self.default_velocity = default_velocity
+        self._count = 0
+        self._xy = np.empty((capacity, 2))
+        self._velocity = np.empty(capacity)
+        # NaN marks a heading that has to be rebuilt
+        self._heading = np.empty(capacity)
+        self._segment = np.zeros(capacity, dtype=np.int8)
+        self._handles = np.zeros((capacity, 4))
+        # Change count at which the path ending on the point, and the turn on the point, last changed shape
+        self._path_changed = np.zeros(capacity, dtype=np.int64)
+        self._turn_changed = np.zeros(capacity, dtype=np.int64)
+        self.change_count = 0
+        self.turns = ti.TurnIndex()
+        self.start_heading = 0.0
+        # Grid over the points for finding the point under the mouse
+        self.grid = si.PointGrid()
+        # Caches, None marks an entry that has to be rebuilt
+        self._samples = []
+        self._path_strings = []
+        self._turn_strings = []
+        # Bumped whenever the matching list of strings changed, so the listboxes are only pushed to Tk then
+        self.path_version = 0
+        self.turn_version = 0
+
+    # Views
+
+    def __len__(self):
+        return self._count
+
+    @staticmethod
+    def _read_only(view):
+        view.flags.writeable = False
+        return view
+
+    @property
+    def points(self):
+        # (n, 2) array of the points in field pixels
+        return self._read_only(self._xy[:self._count])
+
+    @property
+    def velocities(self):
+        # Velocity of every path, velocities[s - 1] for path s
+        return self._read_only(self._velocity[1:self._count])
+
+    @property
+    def segments(self):
+        # Segment type of every path
+        return self._read_only(self._segment[1:self._count])
+
+    @property
+    def handles(self):
+        # Bezier handles of every path as x1, y1, x2, y2, unused by the other segment types
+        return self._read_only(self._handles[1:self._count])
+
+    def row(self, i):
+        # Everything stored on point i: x, y and the velocity, segment type and handles of the path ending on it
+        return (float(self._xy[i, 0]), float(self._xy[i, 1]), float(self._velocity[i]), int(self._segment[i]),
+                tuple(self._handles[i].tolist()))
+
+    def waypoint(self, i):
+        return Waypoint(self, i)
+
+    def waypoints(self):
+        return [Waypoint(self, i) for i in range(self._count)]
+
+    # Lookups
+
+    def converted_point(self, i):
+        return self.coordinates.to_inches(self._xy[i]).tolist()
+
+    def inches(self):
+        # (n, 2) array of the points in inches from the center of the field, rounded like converted_point
+        return self.coordinates.to_inches(self.points)
+
+    def converted_points(self):
+        return self.inches().tolist()
+
+    def heading(self, s):
+        # Walk back to the closest path whose heading is known, then fill the stale ones forward
+        first = s
+        while first > 1 and np.isnan(self._heading[first]) and first - 1 not in self.turns:
+            first -= 1
+        for k in range(first, s + 1):
+            if np.isnan(self._heading[k]):
+                if k - 1 in self.turns:
+                    self._heading[k] = self.turns.get(k - 1)
+                elif k == 1:
+                    self._heading[k] = self.start_heading
+                else:
+                    self._heading[k] = self._heading[k - 1]
+        return float(self._heading[s])
+
+    def samples(self, s):
+        # Sampled polyline of path s, resampled only after the points or handles shaping it changed
+        if self._samples[s - 1] is None:
+            self._samples[s - 1] = cu.sample(int(self._segment[s]), self.points, s, self._handles[s])
+        return self._samples[s - 1]
+
+    def sampled_paths(self):
+        return [self.samples(s) for s in range(1, self._count)]
+
+    def routine_time(self, limits):
+        # Seconds to drive the routine with the motion profile of the given drivetrain limits
+        lengths = [p.length / self.coordinates.pixels_per_inch for p in self.sampled_paths()]
+        headings = [self.start_heading] + [self.heading(s) for s in range(1, self._count)]
+        turn_angles = [headings[s] - headings[s - 1] for s in range(1, len(headings))]
+        return mp.routine_time(lengths, self.velocities, turn_angles, limits)
+
+    def changes_since(self, change_count):
+        # Paths and turn points (as arrays) whose figures changed after the given change count, a turn point may
+        # have lost its turn
+        paths = np.nonzero(self._path_changed[1:self._count] > change_count)[0] + 1
+        turn_points = np.nonzero(self._turn_changed[:self._count] > change_count)[0]
+        return paths, turn_points
+
+    def path_strings(self):
+        for s in range(1, self._count):
+            if self._path_strings[s - 1] is None:
+                self._path_strings[s - 1] = 'Path #' + str(s) + ': ' + hf.generate_path_string(
+                    self.converted_point(s - 1), self.converted_point(s), float(self._velocity[s]), self.heading(s))
+                if self._segment[s] != cu.LINE:
+                    self._path_strings[s - 1] += ' along a ' + cu.SEGMENT_NAMES[int(self._segment[s])]
+        return self._path_strings
+
+    def turn_strings(self):
+        if None in self._turn_strings:
+            converted_points = self.converted_points()
+            for k in range(len(self.turns)):
+                if self._turn_strings[k] is None:
+                    self._turn_strings[k] = 'Turn #' + str(k + 1) + ': ' + hf.generate_turn_string(
+                        self.turns.nth(k), converted_points)
+        return self._turn_strings
+
+    # Invalidation
+
+    def _mark(self, column, first, last):
+        self.change_count += 1
+        column[first:last + 1] = self.change_count
+
+    def _reset_samples(self, s):
+        self._samples[s - 1] = None
+        self._mark(self._path_changed, s, s)
+
+    def _invalidate_path(self, s):
+        if 1 <= s < self._count:
+            self._path_strings[s - 1] = None
+            self.path_version += 1
+
+    def _invalidate_samples(self, first, last):
+        # Paths first to last had a point move, curves shaped by their neighbors also change next to it
+        for s in range(max(first - 1, 1), min(last + 1, self._count - 1) + 1):
+            if first <= s <= last or self._segment[s] in cu.USES_NEIGHBORS:
+                self._reset_samples(s)
+
+    def _invalidate_headings(self, i):
+        # A turn on point i sets the heading of every path up to the point of the next turn
+        next_turn = self.turns.next_after(i)
+        last = self._count - 1 if next_turn is None else min(next_turn, self._count - 1)
+        self._heading[i + 1:last + 1] = np.nan
+        for s in range(i + 1, last + 1):
+            self._invalidate_path(s)
+
+    def _invalidate_all(self):
+        self._heading[:self._count] = np.nan
+        self._samples = [None] * max(self._count - 1, 0)
+        self._path_strings = [None] * max(self._count - 1, 0)
+        self._mark(self._path_changed, 0, self._count - 1)
+        self._mark(self._turn_changed, 0, self._count - 1)
+        self.path_version += 1
+        self._reset_turn_strings()
+
+    def _invalidate_turn(self, i):
+        if i in self.turns:
+            self._turn_strings[self.turns.rank(i)] = None
+            self.turn_version += 1
+
+    def _reset_turn_strings(self):
+        self._turn_strings = [None] * len(self.turns)
+        self.turn_version += 1
+
+    def _reserve(self, count):
+        if count > len(self._xy):
+            capacity = max(count, 2 * len(self._xy))
+            for name in ('_xy', '_velocity', '_heading', '_segment', '_handles', '_path_changed', '_turn_changed'):
+                old = getattr(self, name)
+                new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+                new[:self._count] = old[:self._count]
+                setattr(self, name, new)
+
+    # Edits
+
+    def add_point(self, x, y):
+        i = self._count
+        self._reserve(i + 1)
+        self._xy[i] = x, y
+        self._velocity[i] = self.default_velocity if i > 0 else np.nan
+        self._heading[i] = np.nan
+        self._segment[i] = cu.LINE
+        self._count += 1
+        self.grid.append(x, y)
+        if i > 0:
+            self._samples.append(None)
+            self._path_strings.append(None)
+            self._invalidate_samples(i, i)
+            self._invalidate_path(i)
+
+    def move_point(self, i, x, y):
+        if self._xy[i, 0] == x and self._xy[i, 1] == y:
+            return
+        self._xy[i] = x, y
+        self.grid.move(i, x, y)
+        self._invalidate_samples(i, i + 1)
+        self._mark(self._turn_changed, i, i)
+        self._invalidate_path(i)
+        self._invalidate_path(i + 1)
+        self._invalidate_turn(i)
+
+    def set_start_point(self, x, y):
+        if self._count > 0:
+            self.move_point(0, x, y)
+        else:
+            self.add_point(x, y)
+
+    def delete_point(self, i):
+        n = self._count
+        if 0 < i < n - 1:
+            # The two paths that met at this point become one driven at the speed and shape of the first
+            self._velocity[i + 1] = self._velocity[i]
+            self._segment[i + 1] = self._segment[i]
+            self._handles[i + 1] = self._handles[i]
+        for column in (self._xy, self._velocity, self._heading, self._segment, self._handles):
+            column[i:n - 1] = column[i + 1:n]
+        self._count -= 1
+        if self._count > 0:
+            self._velocity[0] = np.nan
+            self._segment[0] = cu.LINE
+        self.grid.remove(i)
+        if len(self._path_strings) > 0:
+            del self._samples[min(i, len(self._samples) - 1)]
+            del self._path_strings[-1]
+            self._invalidate_samples(i, i)
+        self.turns.remove_point(i)
+        # Everything after the point is renumbered
+        self._mark(self._path_changed, i, self._count - 1)
+        self._mark(self._turn_changed, i, self._count - 1)
+        self._heading[max(i, 1):self._count] = np.nan
+        for s in range(max(i, 1), self._count):
+            self._path_strings[s - 1] = None
+        self.path_version += 1
+        self._reset_turn_strings()
+
+    def insert_point(self, i, x, y, velocity=None, segment=cu.LINE, handles=(0.0, 0.0, 0.0, 0.0)):
+        # Put a point back in at index i, the points from i on move up by one
+        n = self._count
+        self._reserve(n + 1)
+        for column in (self._xy, self._velocity, self._heading, self._segment, self._handles):
+            column[i + 1:n + 1] = column[i:n]
+        self._xy[i] = x, y
+        self._velocity[i] = self.default_velocity if velocity is None else velocity
+        self._segment[i] = segment
+        self._handles[i] = handles
+        if i == 0 and n > 0:
+            # The old start point now ends the first path
+            self._velocity[1] = self.default_velocity
+            self._segment[1] = cu.LINE
+        self._velocity[0] = np.nan
+        self._segment[0] = cu.LINE
+        self._count += 1
+        self.grid.insert(i, x, y)
+        self.turns.insert_point(i)
+        if self._count > 1:
+            self._samples.insert(max(i - 1, 0), None)
+            self._path_strings.append(None)
+            self._invalidate_samples(i, i + 1)
+        # Everything after the point is renumbered
+        self._mark(self._path_changed, i, self._count - 1)
+        self._mark(self._turn_changed, i, self._count - 1)
+        self._heading[max(i, 1):self._count] = np.nan
+        for s in range(max(i, 1), self._count):
+            self._path_strings[s - 1] = None
+        self.path_version += 1
+        self._reset_turn_strings()
+
+    def set_points(self, points):
+        # Move every point at once, the number of points stays the same
+        self._xy[:self._count] = points
+        self.grid.rebuild(self.points)
+        self._invalidate_all()
+
+    def snap(self, mode='1 in'):
+        # Move every point to the closest step of a snap mode of the coordinates in one step
+        snapped = self.coordinates.snap(self.points, mode)
+        if not np.array_equal(snapped, self.points):
+            self.set_points(snapped)
+
+    def mirror(self):
+        # Flip the routine to the other alliance's side of the field
+        self._xy[:self._count] = self.coordinates.mirror(self.points)
+        self._handles[1:self._count] = self.coordinates.mirror(
+            self.handles.reshape(-1, 2)).reshape(-1, 4)
+        self.grid.rebuild(self.points)
+        self.turns = ti.TurnIndex([i, self.coordinates.mirror_heading(angle)] for i, angle in self.turns)
+        self.start_heading = self.coordinates.mirror_heading(self.start_heading)
+        self._invalidate_all()
+
+    def set_velocity(self, s, velocity):
+        if self._velocity[s] != velocity:
+            self._velocity[s] = velocity
+            self._invalidate_path(s)
+
+    def set_segment_type(self, s, kind):
+        if self._segment[s] != kind:
+            if kind == cu.BEZIER:
+                # Start from the handles that keep the shape of a Catmull-Rom curve
+                self._handles[s] = cu.default_handles(self.points, s)
+            self._segment[s] = kind
+            self._reset_samples(s)
+            self._invalidate_path(s)
+
+    def set_handles(self, s, handles):
+        self._handles[s] = handles
+        self._reset_samples(s)
+        self.path_version += 1
+
+    def set_start_heading(self, heading):
+        if self.start_heading != heading:
+            self.start_heading = heading
+            if 0 not in self.turns:
+                self._invalidate_headings(0)
+            else:
+                # The headings stay, but the turn on the start point now turns the robot by another angle
+                self.turn_version += 1
+
+    def add_turn(self, i, angle):
+        self.turns.set(i, float(angle))
+        self._mark(self._turn_changed, i, i)
+        self._invalidate_headings(i)
+        self._reset_turn_strings()
+
+    def remove_turn(self, i):
+        self.turns.remove(i)
+        self._mark(self._turn_changed, i, i)
+        self._invalidate_headings(i)
+        self._reset_turn_strings()
+
+    def set_turn_angle(self, k, angle):
+        # k is the turn number shown in the turn list, starting from 1
+        i, old_angle = self.turns.nth(k - 1)
+        if old_angle != angle:
+            self.turns.set(i, angle)
+            self._mark(self._turn_changed, i, i)
+            self._invalidate_headings(i)
+            self._turn_strings[k - 1] = None
+            self.turn_version += 1
+
+    def clear(self):
+        self.load([], [], [], self.start_heading)
+
+    def load(self, points, turns, velocities, start_heading, segments=None, handles=None):
+        count = len(points)
+        self._count = 0
+        self._reserve(count)
+        self._count = count
+        if count > 0:
+            self._xy[:count] = np.asarray(points, dtype=float).reshape(count, 2)
+            self._velocity[0] = np.nan
+            self._velocity[1:count] = self.default_velocity
+            # Saves hold one velocity per path, anything missing or not above 0 is driven at the default velocity
+            given = np.asarray(velocities, dtype=float)[:count - 1]
+            self._velocity[1:1 + len(given)] = np.where(given > 0, given, self.default_velocity)
+            self._segment[:count] = cu.LINE
+            self._handles[:count] = 0.0
+            if segments is not None:
+                self._segment[1:count] = np.asarray(segments, dtype=np.int8)[:count - 1]
+            if handles is not None:
+                self._handles[1:count] = np.asarray(handles, dtype=float).reshape(-1, 4)[:count - 1]
+        self.grid.rebuild(self.points)
+        self.turns = ti.TurnIndex([t[0], float(t[1])] for t in turns)
+        self.start_heading = start_heading
+        self._invalidate_all()
@@ -0,0 +1,120 @@
+# Python Module Profiling
+# Profiles a studio session so a slow editor or a stuttering simulation can be looked at after the fact. A session
+# runs cProfile on the event loop's thread and a sampling profiler over every thread, which also catches the
+# simulation worker. When it stops it writes two files to the profile directory:
+#   session-<time>.prof       cProfile statistics, for pstats or snakeviz
+#   session-<time>.collapsed  sampled stacks in the collapsed format of flamegraph.pl and speedscope
+# Profiling starts with the studio when AUTON_STUDIO_PROFILE names a directory, and Ctrl+Shift+P in the studio
+# starts or stops a session at any time (writing to ./profiles when the variable is not set).
+import cProfile
+import collections
+import os
+import sys
+import threading
+import time
+
+import Telemetry as te
+
+PROFILE_VARIABLE = 'AUTON_STUDIO_PROFILE'
+DEFAULT_DIRECTORY = 'profiles'
+# Seconds between two samples of the stacks of all threads
+SAMPLE_INTERVAL = 0.005
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+class StackSampler:
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        # Collapsed stack (outermost frame first, separated by ';'): times it was sampled
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as collapsed_file:
+            for stack, count in self.stacks.most_common():
+                collapsed_file.write(f'{stack} {count}\n')
+
+
+class Profiler:
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+        self._profile = None
+        self._sampler = None
+        self._started = None
+
+    @classmethod
+    def from_environment(cls, environment=os.environ):
+        # Profiler writing to the directory in the environment, already running when one is set
+        directory = environment.get(PROFILE_VARIABLE)
+        profiler = cls(directory if directory else DEFAULT_DIRECTORY)
+        if directory:
+            profiler.start()
+        return profiler
+
+    @property
+    def running(self):
+        return self._profile is not None
+
+    def start(self):
+        # Must be called from the thread running the event loop, cProfile only sees the thread that enabled it
+        if self.running:
+            return
+        self._started = time.strftime('%Y%m%d-%H%M%S')
+        self._sampler = StackSampler()
+        self._sampler.start()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        te.log.info('Profiling started')
+
+    def stop(self):
+        # Stop the session and write its files, returns their paths
+        if not self.running:
+            return None
+        self._profile.disable()
+        self._sampler.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f'session-{self._started}')
+        self._profile.dump_stats(base + '.prof')
+        self._sampler.write(base + '.collapsed')
+        self._profile = None
+        self._sampler = None
+        te.log.info('Profile written to %s.prof and %s.collapsed', base, base)
+        return base + '.prof', base + '.collapsed'
+
+    def toggle(self):
+        if self.running:
+            return self.stop()
+        self.start()
+        return None
@@ -0,0 +1,124 @@
+# Python Module Simplify
+# Removes waypoints and turns that do not change where the robot goes. Every waypoint costs a stop in the
+# exported routine, so a hand clicked routine with nearly straight runs of points wastes match time.
+#   - A turn to the heading the robot already has is dropped.
+#   - Runs of straight paths are simplified with Ramer-Douglas-Peucker: a point is dropped when it lies within
+#     the tolerance (in inches) of the straight drive replacing it.
+# Points the robot turns on, the ends of curved paths, the neighbors Catmull-Rom and quintic Hermite paths are shaped
+# by and points where the velocity changes are always kept.
+import collections
+
+import numpy as np
+
+import AutonFile as af
+import Coordinates as co
+import Curves as cu
+import MotionProfile as mp
+
+DEFAULT_TOLERANCE = 1.0
+# Degrees within which a turn counts as being to the current heading
+TURN_TOLERANCE = 1e-6
+
+Simplified = collections.namedtuple('Simplified', ['routine', 'removed_points', 'removed_turns', 'time_saved'])
+
+
+def _segment_distances(points, start, end):
+    # Distance of every point to the segment from start to end
+    direction = end - start
+    length_squared = float(direction @ direction)
+    if length_squared == 0:
+        return np.hypot(*(points - start).T)
+    fractions = np.clip((points - start) @ direction / length_squared, 0.0, 1.0)
+    closest = start + fractions[:, None] * direction
+    return np.hypot(*(points - closest).T)
+
+
+def ramer_douglas_peucker(points, tolerance):
+    # Which points of a polyline to keep so none of the dropped ones is further than the tolerance from the
+    # simplified polyline, the first and last points are always kept
+    points = np.asarray(points, dtype=float)
+    keep = np.zeros(len(points), dtype=bool)
+    if len(points) == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while len(stack) > 0:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(points[first + 1:last], points[first], points[last])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            stack += [(first, middle), (middle, last)]
+    return keep
+
+
+def _without_noop_turns(turns, start_heading):
+    kept = []
+    heading = float(start_heading)
+    for i, angle in sorted([int(t[0]), float(t[1])] for t in turns):
+        if abs(angle - heading) > TURN_TOLERANCE:
+            kept.append([i, angle])
+            heading = angle
+    return kept
+
+
+def routine_time(routine, limits, coordinates=co.FIELD):
+    # Seconds the routine takes with the motion profile of the given limits
+    turns = sorted([int(t[0]), float(t[1])] for t in routine.turns)
+    turn_at = {i: angle for i, angle in turns}
+    angles = []
+    heading = float(routine.start_heading)
+    for i in range(len(routine.points) - 1):
+        if i in turn_at:
+            angles.append(turn_at[i] - heading)
+            heading = turn_at[i]
+    paths = cu.sample_path(np.asarray(routine.points, dtype=float), routine.segments, routine.handles)
+    lengths = coordinates.length_to_inches(np.array([p.length for p in paths]))
+    return mp.routine_time(lengths, routine.velocities, angles, limits)
+
+
+def simplify(routine, tolerance_inches=DEFAULT_TOLERANCE, limits=None, coordinates=co.FIELD):
+    # Simplified copy of an AutonFile.Routine, with the time it saves when the drivetrain limits are given
+    points = np.asarray(routine.points, dtype=float).reshape(-1, 2)
+    count = len(points)
+    turns = _without_noop_turns(routine.turns, routine.start_heading)
+    segments = list(routine.segments) if routine.segments is not None else [cu.LINE] * max(count - 1, 0)
+    handles = ([list(h) for h in routine.handles] if routine.handles is not None
+               else [[0.0, 0.0, 0.0, 0.0] for _ in range(max(count - 1, 0))])
+    velocities = list(routine.velocities)
+
+    fixed = np.zeros(count, dtype=bool)
+    if count > 0:
+        fixed[[0, -1]] = True
+    fixed[[i for i, _ in turns if i < count]] = True
+    for s in range(1, count):
+        if segments[s - 1] != cu.LINE:
+            fixed[[s - 1, s]] = True
+        if segments[s - 1] in cu.USES_NEIGHBORS:
+            # The curve's shape also depends on the points before and after it
+            fixed[[i for i in (s - 2, s + 1) if 0 <= i < count]] = True
+        if s < count - 1 and velocities[s - 1] != velocities[s]:
+            fixed[s] = True
+    keep = fixed.copy()
+    anchors = np.nonzero(fixed)[0]
+    for first, last in zip(anchors[:-1], anchors[1:]):
+        keep[first:last + 1] |= ramer_douglas_peucker(coordinates.length_to_inches(points[first:last + 1]),
+                                                               tolerance_inches)
+
+    kept = np.nonzero(keep)[0]
+    new_index = np.cumsum(keep) - 1
+    simplified = af.Routine(points=points[kept].tolist(),
+                            turns=[[int(new_index[i]), angle] for i, angle in turns],
+                            velocities=[velocities[i - 1] for i in kept[1:]],
+                            start_heading=routine.start_heading, robot_size=routine.robot_size,
+                            field_configuration=routine.field_configuration,
+                            segments=[segments[i - 1] for i in kept[1:]],
+                            handles=[handles[i - 1] for i in kept[1:]])
+    time_saved = None
+    if limits is not None:
+        time_saved = (routine_time(routine, limits, coordinates) -
+                      routine_time(simplified, limits, coordinates))
+    return Simplified(simplified, count - len(kept), len(list(routine.turns)) - len(turns), time_saved)
@@ -0,0 +1,72 @@
+# Python Module SimulationClock
+# Maps wall clock time to the frame of a precomputed trajectory that should be on screen. Playback follows a
+# monotonic clock instead of counting drawn frames, so a slow frame makes the next frames get skipped rather
+# than stretching the whole run: a 30 second routine takes 30 seconds, or 3.75 seconds at 8x.
+import time
+
+MIN_SPEED = 0.25
+MAX_SPEED = 8.0
+
+
+class SimulationClock:
+
+    def __init__(self, frames_per_second, frame_count, speed=1.0, clock=time.monotonic):
+        self.frames_per_second = frames_per_second
+        self.frame_count = frame_count
+        self._clock = clock
+        self.speed = min(max(speed, MIN_SPEED), MAX_SPEED)
+        # Simulated time is anchor_time plus the wall time since anchor_wall_time times the speed
+        self._anchor_time = 0.0
+        self._anchor_wall_time = clock()
+        self.paused = True
+
+    @property
+    def duration(self):
+        return max(self.frame_count - 1, 0) / self.frames_per_second
+
+    def time(self):
+        if self.paused:
+            return self._anchor_time
+        return min(self._anchor_time + (self._clock() - self._anchor_wall_time) * self.speed, self.duration)
+
+    def frame(self):
+        return min(int(self.time() * self.frames_per_second), max(self.frame_count - 1, 0))
+
+    @property
+    def finished(self):
+        return self.time() >= self.duration
+
+    def _reanchor(self, simulated_time):
+        self._anchor_time = min(max(simulated_time, 0.0), self.duration)
+        self._anchor_wall_time = self._clock()
+
+    def start(self):
+        self._reanchor(0.0)
+        self.paused = False
+
+    def pause(self):
+        if not self.paused:
+            self._reanchor(self.time())
+            self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self._reanchor(self._anchor_time)
+            self.paused = False
+
+    def set_speed(self, speed):
+        self._reanchor(self.time())
+        self.speed = min(max(speed, MIN_SPEED), MAX_SPEED)
+
+    def seek(self, seconds):
+        self._reanchor(seconds)
+
+    def seek_frame(self, frame):
+        self._reanchor(frame / self.frames_per_second)
+
+    def seconds_until_next_frame(self):
+        # Wall time until the next frame is due, None while paused or once the end was reached
+        if self.paused or self.finished:
+            return None
+        next_frame_time = (self.frame() + 1) / self.frames_per_second
+        return max((next_frame_time - self.time()) / self.speed, 0.0)
@@ -0,0 +1,110 @@
+# Python Module SimulationWorker
+# Plays precomputed trajectories on a background thread so the studio keeps handling events during a run.
+# The thread follows a SimulationClock shared by every robot being simulated and tells the window which frame
+# is due with write_event_value. Only one frame event is queued at a time: if the event loop falls behind it
+# picks up the latest frames with take_frames() instead of drawing every frame that was missed.
+import threading
+
+import SimulationClock as sc
+
+FRAME_EVENT = '-SIMULATION_FRAME-'
+DONE_EVENT = '-SIMULATION_DONE-'
+
+
+class SimulationWorker:
+
+    def __init__(self, window):
+        self.window = window
+        self.trajectories = {}
+        self.clock = None
+        self._latest = {}
+        self._posted = False
+        self._shown_frame = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self.clock is not None
+
+    @property
+    def paused(self):
+        clock = self.clock
+        return clock is not None and clock.paused
+
+    def start(self, trajectories, speed=1.0):
+        # Start simulating the given trajectories (keyed by robot) from the beginning, replacing any current run.
+        # A trajectory without frames (a routine of one point) has no robot to show and is left out
+        with self._lock:
+            self.trajectories = {key: t for key, t in trajectories.items() if len(t) > 0}
+            frame_rate = max((t.frames_per_second for t in self.trajectories.values()), default=60)
+            self.clock = sc.SimulationClock(frame_rate, max((len(t) for t in self.trajectories.values()), default=0),
+                                            speed)
+            self.clock.start()
+            self._latest = {}
+            self._shown_frame = None
+        self._wake.set()
+
+    def stop(self):
+        with self._lock:
+            self.trajectories = {}
+            self.clock = None
+            self._latest = {}
+        self._wake.set()
+
+    def _control(self, action, *args):
+        with self._lock:
+            if self.clock is not None:
+                getattr(self.clock, action)(*args)
+        self._wake.set()
+
+    def pause(self):
+        self._control('pause')
+
+    def resume(self):
+        self._control('resume')
+
+    def set_speed(self, speed):
+        self._control('set_speed', speed)
+
+    def seek(self, seconds):
+        self._control('seek', seconds)
+
+    def take_frames(self):
+        # Latest frame index of every simulated robot, called by the event loop when it gets a FRAME_EVENT
+        with self._lock:
+            frames = self._latest
+            self._latest = {}
+            self._posted = False
+            return frames
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            post_frame = False
+            finished = False
+            delay = None
+            with self._lock:
+                if self.clock is not None:
+                    frame = self.clock.frame()
+                    if frame != self._shown_frame:
+                        self._shown_frame = frame
+                        self._latest = {key: min(frame, len(t) - 1) for key, t in self.trajectories.items()}
+                        post_frame = not self._posted
+                        self._posted = True
+                    finished = self.clock.finished
+                    delay = self.clock.seconds_until_next_frame()
+                    if finished:
+                        self.clock = None
+            if post_frame:
+                self.window.write_event_value(FRAME_EVENT, None)
+            if finished:
+                self.window.write_event_value(DONE_EVENT, None)
+            self._wake.wait(delay)
+            self._wake.clear()
@@ -0,0 +1,69 @@
+# Python Module SpatialIndex
+# Uniform grid over the field pixel space used to find the point under the mouse. Points are bucketed by the
+# cell they fall in, so a lookup only looks at the cells within the search radius instead of every point.
+import math
+
+
+class PointGrid:
+
+    def __init__(self, cell_size=20):
+        self.cell_size = cell_size
+        self._cells = {}
+        self._positions = []
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def rebuild(self, points):
+        self._cells = {}
+        self._positions = []
+        for p in points:
+            self.append(p[0], p[1])
+
+    def append(self, x, y):
+        i = len(self._positions)
+        self._positions.append((x, y))
+        self._cells.setdefault(self._cell(x, y), []).append(i)
+
+    def move(self, i, x, y):
+        old_cell = self._cell(*self._positions[i])
+        new_cell = self._cell(x, y)
+        self._positions[i] = (x, y)
+        if old_cell != new_cell:
+            self._cells[old_cell].remove(i)
+            if len(self._cells[old_cell]) == 0:
+                del self._cells[old_cell]
+            self._cells.setdefault(new_cell, []).append(i)
+
+    def remove(self, i):
+        # The points after i move down by one, like they do in the list of points
+        del self._positions[i]
+        for cell, indices in list(self._cells.items()):
+            indices[:] = [j - 1 if j > i else j for j in indices if j != i]
+            if len(indices) == 0:
+                del self._cells[cell]
+
+    def insert(self, i, x, y):
+        # The points from i on move up by one, like they do in the list of points
+        for cell, indices in self._cells.items():
+            indices[:] = [j + 1 if j >= i else j for j in indices]
+        self._positions.insert(i, (x, y))
+        self._cells.setdefault(self._cell(x, y), []).append(i)
+
+    def nearest(self, x, y, radius, accept=None):
+        # Index of the closest point within radius of (x, y) that passes accept, None if there is none
+        reach = int(math.ceil(radius / self.cell_size))
+        cell_x, cell_y = self._cell(x, y)
+        best = None
+        best_distance = radius
+        for cx in range(cell_x - reach, cell_x + reach + 1):
+            for cy in range(cell_y - reach, cell_y + reach + 1):
+                for i in self._cells.get((cx, cy), ()):
+                    distance = math.hypot(self._positions[i][0] - x, self._positions[i][1] - y)
+                    if distance < best_distance and (accept is None or accept(i)):
+                        best = i
+                        best_distance = distance
+        return best
@@ -0,0 +1,119 @@
+# Python Module Telemetry
+# Logging and event timing for the studio, both off unless asked for through the environment:
+#   AUTON_STUDIO_LOG        log level (DEBUG, INFO, WARNING, ...), messages go to stderr
+#   AUTON_STUDIO_TELEMETRY  file the event timings are written to as JSON when the studio closes
+# With telemetry on, the studio times every event from the moment read() returned it until its figures were
+# drawn, and counts the figures the FieldScene created, deleted and moved or recolored for it. The timings are
+# summarized per event as p50/p95/p99 latency so the handlers that make the editor sluggish stand out, pressing
+# F9 in the studio logs the summary and writes the file without closing.
+import collections
+import json
+import logging
+import os
+import time
+
+LOG_VARIABLE = 'AUTON_STUDIO_LOG'
+TELEMETRY_VARIABLE = 'AUTON_STUDIO_TELEMETRY'
+
+# Timings kept per event, the oldest are dropped first
+SAMPLES_PER_EVENT = 10000
+
+log = logging.getLogger('AutonStudio')
+log.addHandler(logging.NullHandler())
+log.propagate = False
+
+
+def configure_logging(environment=os.environ):
+    # Send the studio's log to stderr at the level named in the environment, a level is implied by telemetry
+    level = environment.get(LOG_VARIABLE)
+    if level is None and environment.get(TELEMETRY_VARIABLE):
+        level = 'INFO'
+    if level is None:
+        log.setLevel(logging.CRITICAL + 1)
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    log.addHandler(handler)
+    log.setLevel(level.upper())
+
+
+def _percentile(ordered, q):
+    # Linear interpolation between the closest ranks of an ordered list
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class Telemetry:
+
+    def __init__(self, scene=None, path=None, enabled=False, clock=time.perf_counter):
+        self.scene = scene
+        self.path = path
+        self.enabled = enabled
+        self._clock = clock
+        # Event name: deque of (latency ms, created, deleted, updated)
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=SAMPLES_PER_EVENT))
+        self._event = None
+        self._start = 0.0
+        self._counts = (0, 0, 0)
+
+    @classmethod
+    def from_environment(cls, scene=None, environment=os.environ):
+        path = environment.get(TELEMETRY_VARIABLE)
+        return cls(scene, path, enabled=bool(path))
+
+    def _scene_counts(self):
+        if self.scene is None:
+            return 0, 0, 0
+        return self.scene.created, self.scene.deleted, self.scene.updated
+
+    def begin(self, event):
+        # Start timing an event, called right after read() returned it
+        if self.enabled:
+            self._event = str(event)
+            self._start = self._clock()
+            self._counts = self._scene_counts()
+
+    def end(self):
+        # Stop timing the current event once everything it changed is drawn
+        if self.enabled and self._event is not None:
+            latency = (self._clock() - self._start) * 1000
+            counts = self._scene_counts()
+            self._samples[self._event].append((latency,) + tuple(c - b for c, b in zip(counts, self._counts)))
+            self._event = None
+
+    def summary(self):
+        events = {}
+        for event, samples in self._samples.items():
+            latencies = sorted(s[0] for s in samples)
+            count = len(samples)
+            events[event] = {
+                'count': count,
+                'p50_ms': _percentile(latencies, 50),
+                'p95_ms': _percentile(latencies, 95),
+                'p99_ms': _percentile(latencies, 99),
+                'max_ms': latencies[-1],
+                'figures_created': sum(s[1] for s in samples) / count,
+                'figures_deleted': sum(s[2] for s in samples) / count,
+                'figures_updated': sum(s[3] for s in samples) / count,
+            }
+        return events
+
+    def report(self):
+        # Table of the summary, slowest events (by p95) first
+        lines = [f'{"event":<32}{"count":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"created":>9}{"deleted":>9}'
+                 f'{"updated":>9}']
+        for event, row in sorted(self.summary().items(), key=lambda item: -item[1]['p95_ms']):
+            lines.append(f'{event[:31]:<32}{row["count"]:>8}{row["p50_ms"]:>10.2f}{row["p95_ms"]:>10.2f}'
+                         f'{row["p99_ms"]:>10.2f}{row["figures_created"]:>9.1f}{row["figures_deleted"]:>9.1f}'
+                         f'{row["figures_updated"]:>9.1f}')
+        return '\n'.join(lines)
+
+    def dump(self, path=None):
+        path = path if path is not None else self.path
+        if not self.enabled or path is None:
+            return
+        with open(path, 'w') as telemetry_file:
+            json.dump({'events': self.summary()}, telemetry_file, indent=2)
+        log.info('Event timings written to %s', path)
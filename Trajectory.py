@@ -0,0 +1,166 @@
+# Python Module Trajectory
+import math
+
+import numpy as np
+
+import Coordinates as co
+import Curves as cu
+import HelperFunctions as hf
+import MotionProfile as mp
+
+# Every frame is packed as x, y, heading, front x, front y, then the four corners as x/y pairs
+FRAME_STRIDE = 13
+_CORNERS_OFFSET = 5
+
+
+def robot_corners(width_inches, length_inches, coordinates=co.FIELD):
+    # Corners of a robot of the given size in field pixels, bottom right corner first and going clockwise, in
+    # robot space (first value is forward, second is sideways)
+    forward = coordinates.length_to_pixels(length_inches) / 2
+    sideways = coordinates.length_to_pixels(width_inches) / 2
+    return [[forward, -sideways], [-forward, -sideways], [-forward, sideways], [forward, sideways]]
+
+
+# The 18 by 18 inch robot used when no size was entered
+ROBOT_CORNERS = robot_corners(18, 18)
+
+
+def pose_corners(x, y, heading, corners=ROBOT_CORNERS):
+    # Same clockwise rotation matrix as HelperFunctions.calculate_rotation_per_frame
+    sin_h = math.sin(math.radians(heading))
+    cos_h = math.cos(math.radians(heading))
+    return [[x + c[0] * sin_h + c[1] * cos_h, y + c[0] * cos_h - c[1] * sin_h] for c in corners]
+
+
+def pose_front_point(x, y, heading, corners=ROBOT_CORNERS):
+    front = max(c[0] for c in corners)
+    return [x + front * math.sin(math.radians(heading)), y + front * math.cos(math.radians(heading))]
+
+
+class Trajectory:
+
+    def __init__(self, frames, frames_per_second, segment_starts):
+        # Frames x FRAME_STRIDE table
+        self.frames = frames
+        self.frames_per_second = frames_per_second
+        # Index of the first frame of every path (turn frames included), used for scrubbing
+        self.segment_starts = segment_starts
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def duration(self):
+        return max(len(self) - 1, 0) / self.frames_per_second
+
+    def frame_at_time(self, seconds):
+        return min(max(int(seconds * self.frames_per_second), 0), len(self) - 1)
+
+    def position(self, i):
+        return self.frames[i, 0:2].tolist()
+
+    def heading(self, i):
+        return float(self.frames[i, 2])
+
+    def front_point(self, i):
+        return self.frames[i, 3:5].tolist()
+
+    def corners(self, i):
+        return self.frames[i, _CORNERS_OFFSET:].reshape(-1, 2).tolist()
+
+    def footprints(self):
+        # Frames x corners x 2 view of the robot's corners at every frame
+        return self.frames[:, _CORNERS_OFFSET:].reshape(len(self), -1, 2)
+
+    def path_of_frames(self):
+        # Path number (from 1) every frame belongs to, the start frame counts as part of the first path
+        return np.maximum(np.searchsorted(self.segment_starts, np.arange(len(self)), side='right'), 1)
+
+
+def compile_trajectory(points, turns, velocities, start_heading, frames_per_second=60,
+                       pixels_per_inch=co.FIELD.pixels_per_inch, degrees_per_second=45, corners=ROBOT_CORNERS,
+                       paths=None, limits=None):
+    # paths are the sampled polylines of the paths (Curves.Samples) when some of them are curved. Without
+    # limits (MotionProfile.Limits) paths are driven at their velocity and turns at degrees_per_second from the
+    # first frame, with them every path and turn follows the motion profile of the drivetrain
+    if len(points) == 0:
+        return Trajectory(np.empty((0, FRAME_STRIDE)), frames_per_second, [])
+
+    # Heading before and after the turn (if any) placed on the start point of every path
+    turn_angles = {t[0]: float(t[1]) for t in turns}
+    headings_before = []
+    headings_after = []
+    heading = float(start_heading)
+    for i in range(1, len(points)):
+        headings_before.append(heading)
+        heading = turn_angles.get(i - 1, heading)
+        headings_after.append(heading)
+
+    points = np.asarray(points, dtype=float)
+    if limits is not None:
+        turn_headings, turn_counts, move_positions, move_counts = _profiled_motion(
+            points, headings_before, headings_after, velocities, frames_per_second, pixels_per_inch, paths, limits)
+        return _build(points, start_heading, turn_headings, turn_counts, move_positions, move_counts,
+                      headings_after, frames_per_second, corners)
+    turn_headings, turn_counts = hf.interpolate_angles(headings_before, headings_after, degrees_per_second,
+                                                       frames_per_second)
+    if paths is None or len(paths) == 0:
+        move_positions, move_counts = hf.interpolate_segments(points[:-1], points[1:],
+                                                              velocities[:len(points) - 1], frames_per_second,
+                                                              pixels_per_inch)
+    else:
+        move_positions, move_counts = hf.interpolate_polylines(paths, velocities[:len(points) - 1],
+                                                               frames_per_second, pixels_per_inch)
+    return _build(points, start_heading, turn_headings, turn_counts, move_positions, move_counts, headings_after,
+                  frames_per_second, corners)
+
+
+def compile_routine(model, limits, corners=ROBOT_CORNERS, frames_per_second=60):
+    # Trajectory of a PathModel driven with the motion profile of the given limits
+    return compile_trajectory(model.points, model.turns, model.velocities, model.start_heading,
+                              frames_per_second=frames_per_second, pixels_per_inch=model.coordinates.pixels_per_inch,
+                              corners=corners, paths=model.sampled_paths(), limits=limits)
+
+
+def _profiled_motion(points, headings_before, headings_after, velocities, frames_per_second, pixels_per_inch,
+                     paths, limits):
+    if paths is None or len(paths) == 0:
+        paths = cu.sample_path(points)
+    turn_angles = np.asarray(headings_after) - np.asarray(headings_before)
+    turned, turn_counts = mp.turn_tables(turn_angles, limits, frames_per_second)
+    groups, _ = hf.group_steps(turn_counts)
+    turn_headings = np.asarray(headings_before)[groups] + np.sign(turn_angles)[groups] * turned
+    lengths = np.array([p.length for p in paths]) / pixels_per_inch
+    driven, move_counts = mp.path_tables(lengths, velocities[:len(points) - 1], limits, frames_per_second)
+    groups, _ = hf.group_steps(move_counts)
+    move_positions = hf.positions_along(paths, groups, driven * pixels_per_inch)
+    return turn_headings, turn_counts, move_positions, move_counts
+
+
+def _build(points, start_heading, turn_headings, turn_counts, move_positions, move_counts, headings_after,
+           frames_per_second, corners):
+    # Every path turns in place first, then drives; frame 0 is the robot sitting on the start point
+    segment_starts = 1 + np.concatenate(([0], np.cumsum(turn_counts + move_counts)[:-1]))
+    frame_count = 1 + int(turn_counts.sum() + move_counts.sum())
+    poses = np.empty((frame_count, 3))
+    poses[0] = points[0][0], points[0][1], float(start_heading)
+
+    groups, steps = hf.group_steps(turn_counts)
+    turn_frames = segment_starts[groups] + steps - 1
+    poses[turn_frames, 0:2] = points[:-1][groups]
+    poses[turn_frames, 2] = turn_headings
+
+    groups, steps = hf.group_steps(move_counts)
+    move_frames = segment_starts[groups] + turn_counts[groups] + steps - 1
+    poses[move_frames, 0:2] = move_positions
+    poses[move_frames, 2] = np.asarray(headings_after)[groups]
+
+    front = max(c[0] for c in corners)
+    radians = np.radians(poses[:, 2])
+    frames = np.empty((frame_count, FRAME_STRIDE))
+    frames[:, 0:3] = poses
+    frames[:, 3] = poses[:, 0] + front * np.sin(radians)
+    frames[:, 4] = poses[:, 1] + front * np.cos(radians)
+    corner_table = hf.rotate_corners(corners, poses[:, 2]) + poses[:, None, 0:2]
+    frames[:, _CORNERS_OFFSET:] = corner_table.reshape(frame_count, -1)
+    return Trajectory(frames, frames_per_second, segment_starts.tolist())
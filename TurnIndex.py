@@ -0,0 +1,76 @@
+# Python Module TurnIndex
+# Turns keyed by the index of the point they are placed on. Looking up the turn on a point is a dict access,
+# the point indices are also kept in a sorted list so the turns can be walked in order and the turns after a
+# point are found with a binary search. Iterating yields [point index, angle] pairs in point order, the same
+# shape as the old list of turns.
+# Deleting or inserting a point renumbers the turns after it, which costs time in proportion to those turns.
+# Storing an offset instead would make that constant, but the PathModel shifts its columns and renumbers the
+# path strings after the point in the same edit, so the edit stays linear either way and the turns after the
+# point are never more than the points after it.
+from bisect import bisect_left, bisect_right, insort
+
+
+class TurnIndex:
+
+    def __init__(self, turns=()):
+        self._angles = {}
+        self._keys = []
+        for t in turns:
+            self.set(t[0], t[1])
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, i):
+        return i in self._angles
+
+    def __iter__(self):
+        return ([i, self._angles[i]] for i in self._keys)
+
+    def get(self, i, default=None):
+        return self._angles.get(i, default)
+
+    def nth(self, k):
+        # k-th turn in point order, starting from 0
+        i = self._keys[k]
+        return [i, self._angles[i]]
+
+    def rank(self, i):
+        # Position of the turn on point i in point order
+        return bisect_left(self._keys, i)
+
+    def next_after(self, i):
+        # Point index of the first turn after point i, None if there is none
+        k = bisect_right(self._keys, i)
+        return self._keys[k] if k < len(self._keys) else None
+
+    def set(self, i, angle):
+        if i not in self._angles:
+            insort(self._keys, i)
+        self._angles[i] = angle
+
+    def remove(self, i):
+        del self._angles[i]
+        del self._keys[bisect_left(self._keys, i)]
+
+    def remove_point(self, i):
+        # Drop the turn on point i (if any) and shift the turns on the points after it down by one
+        if i in self._angles:
+            self.remove(i)
+        k = bisect_right(self._keys, i)
+        shifted = self._keys[k:]
+        for j in shifted:
+            self._angles[j - 1] = self._angles.pop(j)
+        self._keys[k:] = [j - 1 for j in shifted]
+
+    def insert_point(self, i):
+        # Shift the turns on point i and after it up by one, making room for a point inserted at i
+        k = bisect_left(self._keys, i)
+        shifted = self._keys[k:]
+        for j in reversed(shifted):
+            self._angles[j + 1] = self._angles.pop(j)
+        self._keys[k:] = [j + 1 for j in shifted]
+
+    def clear(self):
+        self._angles.clear()
+        self._keys.clear()